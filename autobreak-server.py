@@ -0,0 +1,305 @@
+try:
+    import argparse
+    import io
+    import json
+    import os
+    import sys
+    import threading
+    from array import array
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+except ImportError as e:
+    missing_module = str(e).split(" ")[-1].replace("'", "")
+    print(f"Error: The required module {missing_module} is not installed.")
+    print(f"Please install it by running 'pip install {missing_module}' and then run the script again.")
+    exit()
+from cadnano_tools.analysis import trace_domain
+from cadnano_tools.autobreak import AutobreakConfig, load_design, trace_design, autobreak_design
+from cadnano_tools.strands import StrandLabels
+from cadnano_tools.profile import Profile
+from cadnano_tools.jsonio import loads, dumps, save_json
+
+# Local JSON-RPC 2.0 server of semi-autobreak analysis. Designs are loaded once and kept in memory as StrandModel,
+# and requests are answered without parsing the file again. Each request is processed in its own thread, and requests
+# to the same design are serialised by the lock of the design.
+# Web pages can send simple cross-origin POST requests to a local server, so only application/json requests without Origin header
+# (not sendable by a browser without CORS preflight, which the server never accepts) are processed, and files are read and
+# written only under the working folder (-root).
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-host', dest='host', type=str, default='127.0.0.1', help='127.0.0.1 by default. Address to listen. Keep it local, as the server reads and writes files on request')
+    parser.add_argument('-port', '-p', dest='port', type=int, default=8765, help='8765 by default. Port to listen')
+    parser.add_argument('-root', dest='root', type=str, default='.', help='Current folder by default. Working folder of load and save requests. Files outside it are refused')
+    parser.add_argument('-verbose', '-v', dest='verbose', action='store_true', help='Print every request and the log of analysis')
+    return parser.parse_args()
+
+# Options of load request, the same names and defaults as semi-autobreak.py
+DEFAULT_OPTIONS = {'min': 18, 'max': 80, 'optimal': 14, 'acceptable': 12, 'distance': 3, 'penalty': 0.3, 'limit': 5000, 'filter': 100, 'beam': False, 'extension': 0, 'sidecar': False}
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+class ThreadOutput(io.TextIOBase):
+    # Replacement of sys.stdout to capture prints of the analysis by each request thread, as the log of the response.
+    def __init__(self, stream, verbose=False):
+        self.stream = stream
+        self.verbose = verbose
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self.local, 'buffer', None)
+        if buffer is None or self.verbose:
+            self.stream.write(text)
+        if buffer is not None:
+            buffer.write(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def capture(self):
+        self.local.buffer = io.StringIO()
+
+    def release(self) -> str:
+        log = self.local.buffer.getvalue()
+        self.local.buffer = None
+        return log
+
+class Design:
+    # A loaded design and its analysis options. The result of the last trace is kept for crossover report,
+    # and staple labels for tracing single staples until the strands are changed.
+    def __init__(self, filename: str, options: dict):
+        self.config = AutobreakConfig(min_length=options['min'], max_length=options['max'], optimal_seed_len=options['optimal'], acceptable_seed_len=options['acceptable'],
+                                      distance=options['distance'], penalty_rate=options['penalty'], limit_num=options['limit'], filter_num=options['filter'], beam=options['beam'], extension=options['extension'], sidecar=options['sidecar'])
+        try:
+            self.config.validate()
+        except ValueError as e:
+            raise RpcError(-32602, f'Invalid params: {e}')
+        self.model = load_design(filename, self.config.sidecar)
+        self.filename = filename
+        self.params = self.config.search_params(self.model)
+        self.result = None
+        self.labels = None
+        self.lock = threading.Lock()
+
+    def staple_count(self) -> int:
+        return sum(len(colours) for colours in self.model.stap_colors)
+
+    def helix_id(self, num: int) -> int:
+        if num not in self.model.num2id:
+            raise RpcError(-32602, f'Invalid params: helix {num} does not exist')
+        return self.model.num2id[num]
+
+    def report(self, result) -> dict:
+        self.result = result
+        return {'domain_report': result.report_lines(), 'counts': result.counts._asdict()}
+
+class Server:
+    def __init__(self, root='.'):
+        self.designs = {}
+        self.lock = threading.Lock()    # for self.designs only
+        self.root = os.path.realpath(root)
+
+    def path(self, filename) -> str:
+        # Path of a file requested by load, save or autobreak (cache), relative to the working folder. Links are resolved before the check.
+        if not isinstance(filename, str):
+            raise RpcError(-32602, 'Invalid params: file should be a string')
+        path = os.path.realpath(os.path.join(self.root, filename))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise RpcError(-32602, f'Invalid params: {filename} is outside the working folder {self.root}')
+        return path
+
+    def design(self, params: dict) -> Design:
+        with self.lock:
+            if params.get('design') not in self.designs:
+                raise RpcError(-32602, f"Invalid params: design {params.get('design')} is not loaded")
+            return self.designs[params['design']]
+
+    def load(self, params: dict) -> dict:
+        # {file, name (file by default), options}: load or reload a design file.
+        options = dict(DEFAULT_OPTIONS)
+        options.update(params.get('options', {}))
+        design = Design(self.path(params['file']), options)
+        name = params.get('name', params['file'])
+        with self.lock:
+            self.designs[name] = design
+        return {'design': name, 'helices': design.model.helix_count, 'length': design.model.length, 'staples': design.staple_count(), 'distance': design.params.distance}
+
+    def unload(self, params: dict) -> dict:
+        with self.lock:
+            if self.designs.pop(params.get('design'), None) is None:
+                raise RpcError(-32602, f"Invalid params: design {params.get('design')} is not loaded")
+        return {'design': params['design']}
+
+    def designs_list(self, params: dict) -> dict:
+        with self.lock:
+            return {'designs': list(self.designs)}
+
+    def trace(self, params: dict) -> dict:
+        # {design, helix, pos}: colour and domain report line of the staple from its 5' end. All staples without helix and pos.
+        design = self.design(params)
+        with design.lock:
+            if 'helix' not in params:
+                return design.report(trace_design(design.model, design.config, design.params))
+            helix_id = design.helix_id(params['helix'])
+            if params['pos'] not in design.model.stap_colors[helix_id]:
+                raise RpcError(-32602, f"Invalid params: no staple 5' end at {params['helix']}[{params['pos']}]")
+            if design.labels is None:
+                design.labels = StrandLabels(design.model)
+            short_domains, staple = trace_domain(design.model, helix_id, params['pos'], design.params, design.config.extension, design.labels)
+            return {'line': staple.line(design.model.nums), 'colour': design.model.stap_colors[helix_id][params['pos']], 'short_domains': [design.model.nums[h] for h in short_domains]}
+
+    def strands(self, params: dict) -> dict:
+        # {design}: number of strands, circular ones and the lengths of scaffold and staples.
+        design = self.design(params)
+        with design.lock:
+            result = {}
+            for kind, name in (('scaf', 'scaffold'), ('stap', 'staple')):
+                labels = StrandLabels(design.model, kind)
+                result[name] = {'strands': labels.strand_count, 'circular': sum(labels.circular), 'lengths': labels.strand_lengths()}
+            return result
+
+    def autobreak(self, params: dict) -> dict:
+        # {design, jobs, cache, budget_ms, profile}: autoconnect and autobreak all staples of the design in memory, and trace again.
+        # With profile true, the time of each phase and the search statistics of each staple are returned as profile.
+        design = self.design(params)
+        with design.lock:
+            cache = self.path(params['cache']) if params.get('cache') is not None else None
+            config = design.config._replace(jobs=params.get('jobs', 1), cache=cache, budget_ms=params.get('budget_ms', 0))
+            design.labels = None
+            profile = Profile() if params.get('profile') else None
+            report = design.report(autobreak_design(design.model, config, design.params, profile=profile))
+            if profile:
+                report['profile'] = profile.to_dict()
+            return report
+
+    def crossover_report(self, params: dict) -> dict:
+        # Short domains are counted by the last trace, or staples are traced if not yet.
+        design = self.design(params)
+        with design.lock:
+            if design.result is None:
+                design.report(trace_design(design.model, design.config, design.params))
+            return {'crossover_report': design.result.crossover_report().splitlines()[:-1]}
+
+    def apply_edit(self, params: dict) -> dict:
+        # {design, bases: [{strand: 'scaf' or 'stap', helix, pos, base: [5' helix, 5' position, 3' helix, 3' position]}], colours: [{helix, pos, colour}]}
+        # Helices are specified by num as cadnano2 JSON. colour null removes the staple 5' end.
+        # All edits are checked before the model is changed, so an invalid edit leaves the design as it was.
+        design = self.design(params)
+        with design.lock:
+            model = design.model
+
+            def in_range(value, stop: int) -> bool:
+                return isinstance(value, int) and not isinstance(value, bool) and 0 <= value < stop
+
+            def pointer(hel, pos, edit) -> tuple:
+                # helix id and position of a 5'/3' neighbour, (-1, -1) for none
+                if hel == -1 and pos == -1:
+                    return -1, -1
+                if not in_range(pos, model.length):
+                    raise RpcError(-32602, f'Invalid params: position {pos} out of range in {edit}')
+                return design.helix_id(hel), pos
+
+            base_edits = []
+            for edit in params.get('bases', []):
+                if not isinstance(edit, dict) or edit.get('strand') not in ('scaf', 'stap') or not in_range(edit.get('pos'), model.length) or not isinstance(edit.get('base'), list) or len(edit['base']) != 4:
+                    raise RpcError(-32602, f'Invalid params: {edit}')
+                prev_hel, prev_pos, next_hel, next_pos = edit['base']
+                i = model.index(design.helix_id(edit['helix']), edit['pos'])
+                base_edits.append((model.scaf if edit['strand'] == 'scaf' else model.stap, i, array('i', [*pointer(prev_hel, prev_pos, edit), *pointer(next_hel, next_pos, edit)])))
+            colour_edits = []
+            for edit in params.get('colours', []):
+                if not isinstance(edit, dict) or not in_range(edit.get('pos'), model.length) or not (edit.get('colour') is None or in_range(edit['colour'], 16777216)):
+                    raise RpcError(-32602, f'Invalid params: {edit}')
+                colour_edits.append((design.helix_id(edit['helix']), edit['pos'], edit['colour']))
+            for strands, i, base in base_edits:
+                strands[i:i + 4] = base
+            for helix_id, pos, colour in colour_edits:
+                if colour is None:
+                    model.stap_colors[helix_id].pop(pos, None)
+                else:
+                    model.set_colour(helix_id, pos, colour)
+            design.result = None
+            design.labels = None
+            return {'staples': design.staple_count()}
+
+    def save(self, params: dict) -> dict:
+        # {design, file}: write the design in memory as cadnano2 JSON.
+        design = self.design(params)
+        with design.lock:
+            save_json(self.path(params['file']), design.model.to_blueprint())
+        return {'file': params['file']}
+
+    METHODS = {'load': load, 'unload': unload, 'designs': designs_list, 'trace': trace, 'strands': strands, 'autobreak': autobreak,
+               'crossover_report': crossover_report, 'apply_edit': apply_edit, 'save': save}
+
+    def handle(self, request) -> dict:
+        # One JSON-RPC request to the response. The prints during the method are returned as log.
+        request_id = request.get('id') if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or request.get('jsonrpc') != '2.0' or not isinstance(request.get('method'), str):
+                raise RpcError(-32600, 'Invalid Request')
+            if request['method'] not in self.METHODS:
+                raise RpcError(-32601, f"Method not found: {request['method']}")
+            params = request.get('params', {})
+            if not isinstance(params, dict):
+                raise RpcError(-32602, 'Invalid params: params should be an object')
+            output.capture()
+            try:
+                result = self.METHODS[request['method']](self, params)
+            finally:
+                log = output.release()
+            result['log'] = log
+            return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        except RpcError as e:
+            return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': e.code, 'message': str(e)}}
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': -32602, 'message': f'Invalid params: {e!r}'}}
+        except OSError as e:
+            return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': -32000, 'message': str(e)}}
+
+class RequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self.send_error(415, 'Content-Type should be application/json')
+            return
+        if 'Origin' in self.headers:
+            self.send_error(403, 'Requests from web pages are refused')
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            request = loads(body)
+        except json.JSONDecodeError:
+            response = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': 'Parse error'}}
+        else:
+            if isinstance(request, list):   # batch
+                response = [self.server.rpc.handle(item) for item in request]
+            else:
+                response = self.server.rpc.handle(request)
+        data = dumps(response)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+if __name__ == '__main__':
+    args = get_args()
+    output = ThreadOutput(sys.stdout, args.verbose)
+    sys.stdout = output
+    httpd = ThreadingHTTPServer((args.host, args.port), RequestHandler)
+    httpd.rpc = Server(args.root)
+    httpd.verbose = args.verbose
+    print(f"Serving semi-autobreak analysis on http://{args.host}:{args.port} (JSON-RPC 2.0 by POST) for files under {httpd.rpc.root}. Stop by Ctrl+C.")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    httpd.server_close()
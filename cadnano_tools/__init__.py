@@ -0,0 +1 @@
+# Shared modules of cadnano-tools scripts.
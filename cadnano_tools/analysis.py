@@ -0,0 +1,325 @@
+import time
+from itertools import compress, repeat
+from operator import and_, eq
+
+from cadnano_tools.search import SearchParams, search_worker, search_in_pool
+from cadnano_tools.model import StrandModel
+from cadnano_tools.lattice import LatticeIndex
+from cadnano_tools.strands import StrandLabels
+from cadnano_tools.domains import DomainRun, StapleDomains, core_length
+
+# Staple analysis of semi-autobreak.py working on StrandModel, shared by the script and the analysis server.
+# Functions only change the model passed and return their results, so designs can be analysed side by side in one process.
+
+COLOUR_NAMES = {16777215: 'fixed', 16776960: 'short', 16711935: 'long', 255: 'optimal', 65535: 'acceptable', 16711680: 'rest'}
+
+def lattice_distance(model: StrandModel, distance=3) -> int:
+    single_array = True  # This evaluates if the design is a single layer structure or not.
+    row, col = min(zip(model.rows, model.cols))
+    for vstrand_row, vstrand_col in zip(model.rows, model.cols):
+        if not (vstrand_row == row or vstrand_col == col):
+            single_array = False
+            break
+
+    print(f"The design is {'single' if single_array else 'multi'}-layer structure.")
+
+    if distance != 3:  # if distance is not default, it is set as user defined.
+        return distance
+    elif model.length % 21 == 0:
+        return distance + distance * single_array  # 3 for honeycomb lattice, 6 for single layer structure on honeycomb lattice.
+    else:
+        return 4 + 4 * single_array  # 4 for square lattice, 8 for single layer structure on square lattice.
+
+def trace_domain(model: StrandModel, helix_id: int, pos_num: int, params: SearchParams, extension=0, labels=None) -> tuple[list, StapleDomains]:
+    # Change color of specific helices according to domain composition.
+    # Bases of the staple are taken from staple labels, built for this staple only if not given.
+    # Domains are recorded as runs, where the bases since the last ssDNA region or domain are closed as a run at the end of the domain.
+    scaf = model.scaf
+    stap = model.stap
+    length = model.length
+    if labels is None:
+        labels = StrandLabels(model)
+    acceptable_count = params.acceptable_seed_len - 1
+    tracer_hel = helix_id
+    domain_num = 0
+    count = 0
+    max_count = 0
+    hel_history = []
+    runs = []
+    ssdna = 0   # length of the current ssDNA region
+
+    for base in labels.strand_bases(helix_id, pos_num):
+        tracer_hel = base // length
+        i = base * 4
+        if scaf[i] == -1 and scaf[i + 2] == -1:  # Both end of scaffold is monitored. If scaffold is blank.
+            if count:
+                runs.append(DomainRun(domain_num, count, True, False))
+            count = 0
+            ssdna += 1  # ssDNA region
+        elif stap[i + 2] == tracer_hel and scaf[i] == tracer_hel:  # if domain continues
+            if ssdna:
+                runs.append(DomainRun(domain_num, ssdna, False, False))
+                ssdna = 0
+            count += 1
+            max_count = max(count, max_count)
+        else:  # domain broken
+            if ssdna:
+                runs.append(DomainRun(domain_num, ssdna, False, False))
+                ssdna = 0
+            if count < 8 and count > 1:
+                hel_history.append(tracer_hel)
+            runs.append(DomainRun(domain_num, count + 1, True, count >= acceptable_count))
+            count = 0
+            domain_num += 1
+    if count < 8 and count > 1:
+        hel_history.append(tracer_hel)
+    if count:   # circular staple
+        runs.append(DomainRun(domain_num, count, True, False))
+    colours = model.stap_colors[helix_id]
+    if colours[pos_num] == 16777215:  # White is left unprocessed.
+        ssdna += extension
+    if ssdna:
+        runs.append(DomainRun(domain_num, ssdna, False, False))
+    staple = StapleDomains((helix_id, pos_num), divmod(base, length), tuple(runs))
+    if colours[pos_num] == 16777215:
+        pass
+    elif core_length(runs) < params.min_length:
+        colours[pos_num] = 16776960  # Yellow when the sequence is too short. Only for short limit, ssDNA region is excluded.
+    elif staple.length > params.max_length:
+        colours[pos_num] = 16711935  # Magenta when the sequence is too long.
+    elif max_count >= params.optimal_seed_len - 1:
+        colours[pos_num] = 255  # optimal strand is painted blue.
+        hel_history = []  # short domains in optimal strand is not counted
+    elif max_count >= acceptable_count:
+        colours[pos_num] = 65535  # Acceptable strand is painted cyan.
+        hel_history = []  # short domains in acceptable strand is not counted
+    else:
+        colours[pos_num] = 16711680  # Rest bad strands are painted red
+    return hel_history, staple   # short domains and the entry of domain report
+
+def trace_all(model: StrandModel, params: SearchParams, extension=0, records=None, labels=None) -> tuple[list, list]:
+    # Trace and colour all staples. Returns the entries of domain report (StapleDomains) and short domains (helix ids) of all staples.
+    # If records dict is given, (entry, short domains) of each staple is recorded by its 5' end (helix id, position).
+    # Staples are labelled once for all, unless the labels of the current model are given.
+    if labels is None:
+        labels = StrandLabels(model)
+    staples = []
+    short_domain_list = []
+    for helix_id in range(model.helix_count):
+        for position in list(model.stap_colors[helix_id]):
+            new_short_domains, staple = trace_domain(model, helix_id, position, params, extension, labels)
+            staples.append(staple)
+            short_domain_list.extend(new_short_domains)
+            if records is not None:
+                records[(helix_id, position)] = (staple, new_short_domains)
+    return staples, short_domain_list
+
+def count_colours(model: StrandModel) -> dict:
+    # Number of staples by the colour given by trace_domain, as {'optimal': count, ...} named in COLOUR_NAMES.
+    counts = dict.fromkeys(COLOUR_NAMES.values(), 0)
+    for colours in model.stap_colors:
+        for colour in colours.values():
+            if colour in COLOUR_NAMES:
+                counts[COLOUR_NAMES[colour]] += 1
+    return counts
+
+def short_domain_counter(count_list, short_domain_list) -> list:
+    # Count number of short domains in each helix
+    for helix_id in short_domain_list:
+        count_list[helix_id] += 1
+    return count_list
+
+def crossover_summary(model: StrandModel, short_domain_list: list) -> list:
+    # Lines of crossover report. short_domain_list is the count of short domains per helix id.
+    # Crossovers of a helix to all of its neighbours are tallied at once, by a single pass over each pointer column of the helix.
+    scaf = model.scaf
+    stap = model.stap
+    length = model.length
+    positions = range(length)
+    lattice = LatticeIndex.from_model(model)
+    summary = ['hel,total,scaf,stap,len,short_domain\n']
+    for i in range(model.helix_count):
+        neighbours = lattice.neighbours(i)
+        if not neighbours:
+            continue
+        start = model.index(i, 0)
+        end = model.index(i + 1, 0)
+        scaf_columns = [scaf[start + n:end:4] for n in range(4)]   # 5' helix, 5' position, 3' helix, 3' position of every base
+        stap_columns = [stap[start + n:end:4] for n in range(4)]
+        scaf_empty = list(map(and_, map(eq, scaf_columns[0], repeat(-1)), map(eq, scaf_columns[2], repeat(-1))))
+        stap_empty = list(map(and_, map(eq, stap_columns[0], repeat(-1)), map(eq, stap_columns[2], repeat(-1))))
+        filled_len = length - sum(map(and_, scaf_empty, stap_empty))   # If both scaffold and staple are empty, it is subtracted from length of the helix
+        # Crossover is the pointer to the same position of another helix. Bridged positions (unmatched) are excluded, and the base without its counterpart (external loop) is excluded.
+        # If accept loose connection as crossover, remove the latter condition. A base is counted once per neighbour, as scaffold crossover in priority.
+        crossovers = {}     # (position, neighbour): 'scaf' or 'stap'
+        for kind, hel_column, pos_column, counterpart_empty in (('scaf', scaf_columns[0], scaf_columns[1], stap_empty), ('scaf', scaf_columns[2], scaf_columns[3], stap_empty),
+                                                                ('stap', stap_columns[0], stap_columns[1], scaf_empty), ('stap', stap_columns[2], stap_columns[3], scaf_empty)):
+            for k in compress(positions, map(eq, pos_column, positions)):
+                if not counterpart_empty[k]:
+                    crossovers.setdefault((k, hel_column[k]), kind)
+        counts = {neighbour: {'scaf': 0, 'stap': 0} for neighbour in neighbours}
+        for (_, hel), kind in crossovers.items():
+            if hel in counts:
+                counts[hel][kind] += 1
+        for neighbour in neighbours:
+            count_scaf = counts[neighbour]['scaf']
+            count_stap = counts[neighbour]['stap']
+            summary.append(f"{model.nums[i]}-{model.nums[neighbour]},{count_scaf + count_stap},{count_scaf},{count_stap},{filled_len},{short_domain_list[i]}\n")
+    return summary
+
+def autobreak_staples(model: StrandModel, staples: list, params: SearchParams, jobs=1, cache=None, groups=None, first_group=0, labels=None, budget_ms=0, profile=None, quiet=False, truncated=None):
+    # Break staples listed as entries of domain report (StapleDomains). cache is an open SearchCache, or None.
+    # If groups dict is given, 5' ends of the resulting staples are recorded with the index of the entry they are broken from (plus first_group).
+    # Break points are located by staple labels of the model before breaking, which stay valid as breaking only cuts the strands.
+    # The search of each staple is limited to budget_ms if given, and the number of truncated searches is printed. Truncated results are not cached.
+    # If truncated set is given, 5' ends of the resulting staples of truncated searches are added to it, for the domain report.
+    # Search and break times and the search statistics of each staple are recorded to profile if given. Messages of each staple are not printed if quiet.
+    if labels is None:
+        labels = StrandLabels(model)
+    search_start = time.perf_counter()
+    sequences = list(dict.fromkeys(staple.runs for staple in staples))  # unique domain runs, as the result only depends on it
+    found = {}  # domain runs: (split_length, log, SearchStats or None if cached), from cache or searched in this run
+    if cache:
+        for sequence in sequences:
+            result = cache.get(sequence, params)
+            if result is not None:
+                found[sequence] = (*result, None)
+    if jobs != 1:   # search all the rest staples in parallel first, and the breaks are applied in the same order as serial run below.
+        missing = [sequence for sequence in sequences if sequence not in found]
+        found.update(zip(missing, search_in_pool(missing, params, jobs, budget_ms)))
+        if cache:
+            for sequence in missing:
+                if found[sequence][2].completed:
+                    cache.put(sequence, params, *found[sequence][:2])
+    search_time = time.perf_counter() - search_start
+    break_time = 0
+    sources = {}    # domain runs already recorded to profile
+    # for each staple, get domains and split it
+    for group, staple in enumerate(staples, first_group):
+        sequence = staple.runs
+        hel, pos = staple.five_prime
+        if not quiet:
+            print("autobreaking staple: " + str(model.nums[hel]) + "[" + str(pos) + "] len=" + str(staple.length) + "...")
+        if sequence not in found:
+            search_start = time.perf_counter()
+            found[sequence] = search_worker((sequence, params, budget_ms))
+            if cache and found[sequence][2].completed:
+                cache.put(sequence, params, *found[sequence][:2])
+            search_time += time.perf_counter() - search_start
+        split_length, log, stats = found[sequence]
+        completed = stats is None or stats.completed     # only completed results are cached
+        if profile:
+            source = 'shared' if sequence in sources else 'cache' if stats is None else 'search'
+            sources.setdefault(sequence, source)
+            profile.add_staple(str(model.nums[hel]) + "[" + str(pos) + "]", staple.length, source, stats)
+        if not quiet:
+            print(log, end='')
+        break_start = time.perf_counter()
+        if groups is not None:
+            groups[(hel, pos)] = group
+        if truncated is not None and not completed:
+            truncated.add((hel, pos))
+        skip_strand = False
+        if split_length != []:
+            colours = model.stap_colors[hel]
+            if pos in colours:
+                if colours[pos] == 16777215: # if the strand is white, skip
+                    skip_strand = True
+                else:
+                    colours[pos] = 65280 # change colour to green, when this strand is edited
+            for i in range(len(split_length)):
+                if not skip_strand:
+                    hel, pos = break_3_end(model, hel, pos, split_length[i], labels)
+                    if groups is not None:
+                        groups[(hel, pos)] = group
+                    if truncated is not None and not completed:
+                        truncated.add((hel, pos))
+                elif not quiet:
+                    print("autobreak skipped")  # if the strand is white, skip. Its breaking pattern is still searched above (search_worker or search_in_pool), which is wasted, but ignored for now.
+        break_time += time.perf_counter() - break_start
+    if profile:
+        profile.add('search', search_time)
+        profile.add('break', break_time)
+    if budget_ms > 0:
+        truncated = sum(found[staple.runs][2] is not None and not found[staple.runs][2].completed for staple in staples)
+        print(f"Search budget {budget_ms} ms: {len(staples) - truncated} staples searched completely, {truncated} truncated")
+
+def break_3_end(model: StrandModel, hel_id: int, pos_num: int, split_length: int, labels: StrandLabels) -> tuple[int, int]:
+    # Break the staple split_length bases after the base, and return the new 5' end.
+    bases = labels.strand_bases(hel_id, pos_num)
+    last_base = bases[split_length - 1]
+    base = bases[split_length]
+    stap = model.stap
+    stap[last_base * 4 + 2] = -1
+    stap[last_base * 4 + 3] = -1
+    stap[base * 4] = -1
+    stap[base * 4 + 1] = -1
+    tracer_hel, tracer_pos = divmod(base, model.length)
+    model.set_colour(tracer_hel, tracer_pos, 65280)
+    return tracer_hel, tracer_pos
+
+def autoconnect(model: StrandModel, ends=None, quiet=False) -> StrandModel:
+    # Reconnect staple breaks from each staple 5' end, in the order of stap_colors except white ones unless ends are specified.
+    # Reconnected staples are not printed if quiet, while staples left broken are.
+    # Staples are labelled once, and joined staples are tracked as a group with the 5' end of the first and the 3' end of the last.
+    if ends is None:
+        ends = [(helix_id, position) for helix_id in range(model.helix_count) for position, colour in model.stap_colors[helix_id].items() if colour != 16777215] # if the strand is white, skip
+    labels = StrandLabels(model)
+    joined_to = list(range(labels.strand_count))    # union-find of joined staples
+    heads = [labels.five_prime(strand_id) for strand_id in range(labels.strand_count)]
+    tails = [labels.three_prime(strand_id) for strand_id in range(labels.strand_count)]
+
+    def group(strand_id: int) -> int:
+        while joined_to[strand_id] != strand_id:
+            joined_to[strand_id] = joined_to[joined_to[strand_id]]
+            strand_id = joined_to[strand_id]
+        return strand_id
+
+    for helix_id, position in ends:
+        strand_id = labels.strand_of[labels.base(helix_id, position)]
+        if strand_id == -1 or labels.circular[strand_id]:
+            continue
+        reconnect_breaks(model, labels, group(strand_id), heads, tails, joined_to, quiet)
+    return model
+
+def reconnect_breaks(model: StrandModel, labels: StrandLabels, strand_id: int, heads: list, tails: list, joined_to: list, quiet=False):
+    # Join the 3' end of the staple group to the next staple 5' end on the same helix, if possible.
+    # One break is connected at a time, and the following break is left to the call from the 5' end of the joined staple.
+    stap = model.stap
+    length = model.length
+    nums = model.nums
+    start_hel, start_pos = divmod(heads[strand_id], length)
+    last_tracer_hel, last_tracer_pos = divmod(tails[strand_id], length)
+    # connect break if next position is filled
+    i = tails[strand_id] * 4
+    if stap[i + 1] != -1:
+        direction = last_tracer_pos - stap[i + 1]    # if pos num of 3' is larger, +1, if smaller, -1
+    else:
+        direction = - last_tracer_pos + stap[i + 3]
+    next_pos = last_tracer_pos + direction
+    if not 0 <= next_pos < length:  # end of the helix
+        return
+    next_base = last_tracer_hel * length + next_pos
+    j = next_base * 4
+    if not (stap[j] == -1 and stap[j + 1] == -1 and stap[j + 2] != -1 and stap[j + 3] != -1):
+        return
+    if next_base == heads[strand_id]:    # exclude circular connection
+        print("Strand: " + str(nums[start_hel]) + "[" + str(start_pos) + "] was left broken to avold loop")
+        return
+    # fill gap and remove the color of connected staple, only when the 3' strand is not white.
+    colours = model.stap_colors[last_tracer_hel]
+    if next_pos not in colours:
+        return
+    if colours[next_pos] == 16777215: # White strand is left intact, for manual editing.
+        print("Strand: " + str(nums[last_tracer_hel]) + "[" + str(last_tracer_pos) + "] was left broken as specified")
+        return
+    stap[i + 2] = last_tracer_hel
+    stap[i + 3] = next_pos
+    stap[j] = last_tracer_hel
+    stap[j + 1] = last_tracer_pos
+    if not quiet:
+        print("reconnected strand: " + str(nums[start_hel]) + "[" + str(start_pos) + "] at " + str(nums[last_tracer_hel]) + "[" + str(next_pos) + "]")
+    colours.pop(next_pos)
+    next_strand = labels.strand_of[next_base]
+    joined_to[next_strand] = strand_id
+    tails[strand_id] = tails[next_strand]
@@ -0,0 +1,241 @@
+import os
+from typing import NamedTuple, Optional
+
+from cadnano_tools.search import SearchParams
+from cadnano_tools.cache import SearchCache
+from cadnano_tools.model import StrandModel
+from cadnano_tools.analysis import lattice_distance, trace_domain, trace_all, count_colours, short_domain_counter, crossover_summary, autobreak_staples, autoconnect
+from cadnano_tools.strands import StrandLabels
+from cadnano_tools.incremental import load_state, same_layout, dirty_staples
+from cadnano_tools.profile import timed
+from cadnano_tools.jsonio import load_json, save_json
+from cadnano_tools.sidecar import load_with_sidecar
+
+# Library API of semi-autobreak.py. All state of a run is held by the design (StrandModel) and the returned result,
+# so designs can be analysed repeatedly in one process, or from threads with a design per thread.
+#
+#     config = AutobreakConfig(min_length=20)
+#     result = autobreak_design(load_design('design.json'), config)
+#     print(result.counts.optimal, result.domain_report())
+
+class AutobreakConfig(NamedTuple):
+    # Options of semi-autobreak.py. distance 3 (default) is adjusted to the lattice of the design, the same as the command line.
+    min_length: int = 18
+    max_length: int = 80
+    optimal_seed_len: int = 14
+    acceptable_seed_len: int = 12
+    distance: int = 3
+    penalty_rate: float = 0.3
+    limit_num: int = 5000
+    filter_num: int = 100
+    beam: bool = False
+    extension: int = 0
+    jobs: int = 1
+    cache: Optional[str] = None     # path of SearchCache file
+    cache_size: int = 100000
+    budget_ms: int = 0      # time limit of the search per staple, 0 for no limit
+    quiet: bool = False     # messages of each staple are not printed
+    sidecar: bool = False   # design files are loaded from their binary sidecar (cadnano_tools.sidecar)
+
+    def validate(self):
+        if self.min_length > self.max_length:
+            raise ValueError(f'max length {self.max_length} shuold be larger than min length {self.min_length}')
+        if self.optimal_seed_len < self.acceptable_seed_len:
+            raise ValueError(f'optimal seeding length {self.optimal_seed_len} shuold be larger than acceptable seed length {self.acceptable_seed_len}')
+
+    def search_params(self, model: StrandModel) -> SearchParams:
+        return SearchParams(min_length=self.min_length, max_length=self.max_length, optimal_seed_len=self.optimal_seed_len, acceptable_seed_len=self.acceptable_seed_len,
+                            distance=lattice_distance(model, self.distance), penalty_rate=self.penalty_rate, limit_num=self.limit_num, filter_num=self.filter_num, beam=self.beam)
+
+    def describe(self, distance: int) -> str:
+        # Options printed for reference at the end of the run.
+        return f"Options: min_length: {self.min_length}, max_length: {self.max_length}, optimal_seed_len: {self.optimal_seed_len}, acceptable_seed_len: {self.acceptable_seed_len}, distance: {distance}, penalty_rate: {self.penalty_rate}, filter: {self.filter_num}, limit: {self.limit_num}"
+
+    def state_options(self, params: SearchParams) -> list:
+        # previous result is reused by incremental_autobreak only with the same options
+        return list(params) + [self.extension, self.budget_ms]
+
+class StrandCounts(NamedTuple):
+    # Number of staples by colour. Fixed (white) staples are excluded from total.
+    optimal: int = 0
+    acceptable: int = 0
+    rest: int = 0
+    short: int = 0
+    long: int = 0
+    fixed: int = 0
+
+    @classmethod
+    def from_model(cls, model: StrandModel):
+        return cls(**count_colours(model))
+
+    @property
+    def total(self) -> int:
+        return self.acceptable + self.optimal + self.rest + self.short + self.long
+
+    def summary(self) -> str:
+        # The color summary printed by semi-autobreak.py, empty if no staple is counted.
+        if self.total == 0:
+            return ''
+        return (f"Total strands: {self.total}\n"
+                f"Acceptable strands: {self.acceptable}\n"
+                f"Optimal strands: {self.optimal}\n"
+                f"Rest strands: {self.rest}\n"
+                f"Short strands: {self.short}\n"
+                f"Long strands: {self.long}\n"
+                f"Fixed strands (excluded from total strand): {self.fixed}\n"
+                f"Optimal strand percentage: {(self.optimal / self.total) * 100:.2f}%\n"
+                f"Optimal and Acceptable strand percentage: {((self.optimal + self.acceptable) / self.total) * 100:.2f}%\n")
+
+class AutobreakResult(NamedTuple):
+    # Analysed design and its reports. staples are entries of domain report (StapleDomains) and short_domain_list is helix ids of short domains, of all staples.
+    # groups and records are kept for the state file of incremental_autobreak when requested.
+    # With a search budget, truncated holds 5' ends of staples broken by truncated searches, and the domain report gets the search column.
+    model: StrandModel
+    params: SearchParams
+    staples: list
+    short_domain_list: list
+    counts: StrandCounts
+    groups: Optional[dict] = None
+    records: Optional[dict] = None
+    intermediate: Optional[dict] = None     # design just after autobreak, before colouring, when requested
+    truncated: Optional[set] = None
+
+    def search_status(self, staple) -> str:
+        # truncated by the budget, or optimal (complete for the legacy beam search, which does not prove it)
+        if staple.five_prime in self.truncated:
+            return 'truncated'
+        return 'complete' if self.params.beam else 'optimal'
+
+    def report_lines(self) -> list:
+        # Lines of domain report, rendered from the domain runs.
+        if self.truncated is not None:
+            return [f'{staple.line(self.model.nums)},{self.search_status(staple)}' for staple in self.staples]
+        return [staple.line(self.model.nums) for staple in self.staples]
+
+    def domain_report(self) -> str:
+        header = 'start,end,domains,length,search\n' if self.truncated is not None else 'start,end,domains,length\n'
+        return header + ''.join(line + '\n' for line in self.report_lines())
+
+    def crossover_report(self) -> str:
+        short_domain_count = short_domain_counter([0] * self.model.helix_count, self.short_domain_list)
+        return ''.join(crossover_summary(self.model, short_domain_count)) + '\n'
+
+    def blueprint(self) -> dict:
+        return self.model.to_blueprint()
+
+def write_outputs(result: AutobreakResult, outputs: set, directory='.', suffix='', profile=None):
+    # Requested files among 'json', 'domain' and 'crossover' are written at once each, with the suffix to the file names.
+    if 'crossover' in outputs:
+        with timed(profile, 'crossover_report'):
+            crossover_report = result.crossover_report()
+    with timed(profile, 'write'):
+        if 'domain' in outputs:
+            with open(os.path.join(directory, f'domain_report{suffix}.csv'), 'w') as f:
+                f.write(result.domain_report())
+        if 'crossover' in outputs:
+            with open(os.path.join(directory, f'crossover_report{suffix}.csv'), 'w') as f:
+                f.write(crossover_report)
+        if 'json' in outputs:
+            save_json(os.path.join(directory, f'output{suffix}.json'), result.blueprint())
+        if result.intermediate:
+            save_json(os.path.join(directory, 'output_autobreak.json'), result.intermediate)
+
+def load_design(filename: str, sidecar=False) -> StrandModel:
+    # JSON file of cadnano2 design, or its gzip-compressed file. With sidecar, the arrays are memory-mapped from the sidecar of the file,
+    # which is written on the first load and after the file is changed.
+    if sidecar:
+        return load_with_sidecar(filename)
+    return StrandModel(load_json(filename))
+
+def trace_design(model: StrandModel, config: AutobreakConfig, params=None, records=None, labels=None, profile=None) -> AutobreakResult:
+    # Colour all staples without breaking (-manual). params is calculated from config if not given, and labels of staples too.
+    # Phases of the run are timed by profile (Profile) if given, in all functions below.
+    params = params or config.search_params(model)
+    with timed(profile, 'trace'):
+        staples, short_domain_list = trace_all(model, params, config.extension, records, labels)
+        counts = StrandCounts.from_model(model)
+    return AutobreakResult(model, params, staples, short_domain_list, counts, records=records)
+
+def autoconnect_design(model: StrandModel, config: AutobreakConfig, params=None, profile=None) -> AutobreakResult:
+    # Reconnect all breaks and colour staples (-connect).
+    params = params or config.search_params(model)
+    with timed(profile, 'autoconnect'):
+        autoconnect(model, quiet=config.quiet)
+    return trace_design(model, config, params, profile=profile)
+
+def autobreak_design(model: StrandModel, config: AutobreakConfig, params=None, record=False, keep_intermediate=False, profile=None) -> AutobreakResult:
+    # Reconnect all breaks, break staples by the search and colour them. Staples are passed in memory between the steps.
+    # With record, groups and records for the state file are kept in the result.
+    # Staples are labelled once after autoconnect, for both the trace and the breaks.
+    params = params or config.search_params(model)
+    with timed(profile, 'autoconnect'):
+        autoconnect(model, quiet=config.quiet)
+    with timed(profile, 'trace'):
+        labels = StrandLabels(model)
+    connected = trace_design(model, config, params, labels=labels, profile=profile)
+    groups = {} if record else None
+    truncated = set() if config.budget_ms > 0 else None
+    cache = SearchCache(config.cache, config.cache_size) if config.cache else None
+    autobreak_staples(model, connected.staples, params, config.jobs, cache, groups, labels=labels, budget_ms=config.budget_ms, profile=profile, quiet=config.quiet, truncated=truncated)
+    if cache:
+        cache.close()
+        print(cache.summary())
+    intermediate = model.to_blueprint() if keep_intermediate else None
+    result = trace_design(model, config, params, {} if record else None, profile=profile)
+    return result._replace(groups=groups, intermediate=intermediate, truncated=truncated)
+
+def incremental_autobreak(model: StrandModel, config: AutobreakConfig, previous_file: str, state_path: str, params=None, keep_intermediate=False, profile=None):
+    # Autobreak and trace again only staples changed from previous_file, the output recorded in state_path, and reuse the rest.
+    # All staples broken from the same connected staple are processed together. Staples not retraced are kept as broken by the previous run.
+    # The result can differ from a fresh autobreak_design of the same input: where autoconnect leaves a staple broken to avoid a loop
+    # depends on the order of stap_colors, which the previous breaks change, so a full run is not reproduced on its own output either.
+    # Returns the result with groups and records, False if the previous result is not reusable, or None if the model was changed before it was found.
+    params = params or config.search_params(model)
+    state = load_state(state_path, config.state_options(params), previous_file)
+    if state is None:
+        return False
+    previous = load_design(previous_file, config.sidecar)
+    if not same_layout(model, previous):
+        print(f"Helices are changed from {previous_file}.")
+        return False
+    dirty = dirty_staples(model, previous, state)
+    del previous
+    if dirty is None:
+        print("Circular staple is found.")
+        return False
+    clean = {(helix_id, position) for helix_id in range(model.helix_count) for position in model.stap_colors[helix_id] if (helix_id, position) not in dirty}
+    # autoconnect of changed staples
+    ends = [(helix_id, position) for helix_id in range(model.helix_count) for position, colour in model.stap_colors[helix_id].items() if (helix_id, position) in dirty and colour != 16777215]
+    with timed(profile, 'autoconnect'):
+        autoconnect(model, ends, config.quiet)
+    if any(position not in model.stap_colors[helix_id] for helix_id, position in clean):
+        print("Changed staple is connected to unchanged staple.")
+        return None
+    # autobreak of changed staples
+    with timed(profile, 'trace'):
+        labels = StrandLabels(model)
+        staples = [trace_domain(model, helix_id, position, params, config.extension, labels)[1] for helix_id in range(model.helix_count) for position in list(model.stap_colors[helix_id]) if (helix_id, position) not in clean]
+    groups = {end: state['groups'][end] for end in clean}
+    truncated = state['truncated'] & clean if config.budget_ms > 0 else None   # the budget is the same as the previous run
+    cache = SearchCache(config.cache, config.cache_size) if config.cache else None
+    autobreak_staples(model, staples, params, config.jobs, cache, groups, max(state['groups'].values(), default=-1) + 1, labels, config.budget_ms, profile, config.quiet, truncated)
+    if cache:
+        cache.close()
+        print(cache.summary())
+    intermediate = model.to_blueprint() if keep_intermediate else None
+    # color change, with domains of unchanged staples copied from the previous run
+    with timed(profile, 'trace'):
+        labels = StrandLabels(model)
+        records = {}
+        short_domain_list = []
+        for helix_id in range(model.helix_count):
+            for position in list(model.stap_colors[helix_id]):
+                if (helix_id, position) in clean:
+                    staple, new_short_domains = state['records'][(helix_id, position)]
+                else:
+                    new_short_domains, staple = trace_domain(model, helix_id, position, params, config.extension, labels)
+                records[(helix_id, position)] = (staple, new_short_domains)
+                short_domain_list.extend(new_short_domains)
+        counts = StrandCounts.from_model(model)
+    print(f"Retraced {len(records) - len(clean)} of {len(records)} staples changed from {previous_file}")
+    return AutobreakResult(model, params, [staple for staple, _ in records.values()], short_domain_list, counts, groups, records, intermediate, truncated)
@@ -0,0 +1,104 @@
+import contextlib
+import glob
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from cadnano_tools.autobreak import AutobreakConfig, StrandCounts, load_design, trace_design, autoconnect_design, autobreak_design, write_outputs
+from cadnano_tools.incremental import save_state
+from cadnano_tools.profile import Profile, timed
+
+# Batch run of semi-autobreak.py over many designs. Each design is analysed in a worker process and written to its own folder
+# (the file name without extension) under the batch folder, together with its log. The counts of all designs are tabulated in
+# batch_summary.csv of the batch folder.
+
+SUMMARY_HEADER = 'design,total,optimal,acceptable,rest,short,long,fixed,optimal_percentage,optimal_acceptable_percentage,error\n'
+
+def expand_inputs(patterns: list) -> tuple[list, bool]:
+    # Input files from file paths, glob patterns and folders (all *.json inside). Batch mode unless a single file is given.
+    files = []
+    batch = len(patterns) > 1
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.extend(sorted(glob.glob(os.path.join(pattern, '*.json'))))
+            batch = True
+        elif glob.has_magic(pattern):
+            files.extend(sorted(glob.glob(pattern)))
+            batch = True
+        else:
+            files.append(pattern)
+    return list(dict.fromkeys(files)), batch
+
+def output_folders(files: list, batch_dir: str) -> list:
+    # Folder per design named by the file name, numbered if the same name appears twice.
+    folders = []
+    used = set()
+    for filename in files:
+        name = os.path.splitext(os.path.basename(filename))[0]
+        folder = name
+        number = 2
+        while folder in used:
+            folder = f'{name}_{number}'
+            number += 1
+        used.add(folder)
+        folders.append(os.path.join(batch_dir, folder))
+    return folders
+
+def batch_worker(task: tuple) -> tuple:
+    # Runs in a worker process. Returns (counts, error message) of the design. Messages are written to log.txt in the folder.
+    input_file, folder, config, mode, outputs, state_name, profile_name = task
+    os.makedirs(folder, exist_ok=True)
+    counts = None
+    error = ''
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        try:
+            profile = Profile() if profile_name else None
+            with timed(profile, 'load'):
+                model = load_design(input_file, config.sidecar)
+            params = config.search_params(model)
+            if mode == 'manual':
+                result = trace_design(model, config, params, profile=profile)
+            elif mode == 'connect':
+                result = autoconnect_design(model, config, params, profile)
+            else:
+                result = autobreak_design(model, config, params, record=bool(state_name), keep_intermediate=mode == 'color', profile=profile)
+            write_outputs(result, outputs, folder, '_autoconnect' if mode == 'connect' else '', profile)
+            if state_name and result.records is not None:
+                with timed(profile, 'write'):
+                    save_state(os.path.join(folder, state_name), config.state_options(params), os.path.join(folder, 'output.json'), result.groups, result.records, result.truncated)
+            if profile:
+                profile.write(os.path.join(folder, profile_name), design=input_file, options=config._asdict())
+            print(config.describe(params.distance))
+            print(result.counts.summary(), end='')
+            counts = result.counts
+        except Exception as e:     # a broken design should not stop the rest of the batch
+            error = f'{type(e).__name__}: {e}'
+            print(f'Error: {error}')
+    with open(os.path.join(folder, 'log.txt'), 'w') as f:
+        f.write(log.getvalue())
+    return counts, error
+
+def summary_row(name: str, counts: StrandCounts, error: str) -> str:
+    if counts is None or counts.total == 0:
+        values = [''] * 9 if counts is None else [str(value) for value in (counts.total, *counts)] + ['', '']
+    else:
+        values = [str(value) for value in (counts.total, *counts)] + [f'{counts.optimal / counts.total * 100:.2f}', f'{(counts.optimal + counts.acceptable) / counts.total * 100:.2f}']
+    return ','.join([name] + values + [error.replace(',', ';').replace('\n', ' ')]) + '\n'
+
+def run_batch(files: list, batch_dir: str, config: AutobreakConfig, mode='autobreak', outputs=frozenset({'json', 'domain', 'crossover'}), jobs=1, state_name=None, profile_name=None) -> list:
+    # Designs are distributed over jobs processes (0 for all CPU cores), each searched serially. Returns (file, folder, counts, error) in input order.
+    # mode is 'autobreak', 'color' (autobreak keeping output_autobreak.json), 'manual' or 'connect'.
+    # State and profile files of each design are written in its folder with the names given.
+    os.makedirs(batch_dir, exist_ok=True)
+    folders = output_folders(files, batch_dir)
+    config = config._replace(jobs=1)
+    tasks = [(filename, folder, config, mode, outputs, state_name, profile_name) for filename, folder in zip(files, folders)]
+    jobs = jobs if jobs > 0 else os.cpu_count() or 1
+    results = []
+    with ProcessPoolExecutor(max_workers=min(jobs, max(1, len(tasks)))) as executor:
+        for (filename, folder, *_), (counts, error) in zip(tasks, executor.map(batch_worker, tasks)):
+            print(f"{filename}: {'error, ' + error if error else str(counts.total) + ' strands'} -> {folder}")
+            results.append((filename, folder, counts, error))
+    with open(os.path.join(batch_dir, 'batch_summary.csv'), 'w') as f:
+        f.write(SUMMARY_HEADER + ''.join(summary_row(os.path.basename(folder), counts, error) for _, folder, counts, error in results))
+    return results
@@ -0,0 +1,46 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+from cadnano_tools.search import SearchParams
+
+class SearchCache:
+    # Persistent cache of breaking pattern search results, shared between runs.
+    # Results are addressed by the domain runs and all search parameters, so an unchanged staple is never searched again.
+    # The least recently used entries are evicted when the cache exceeds max_entries.
+    def __init__(self, path: str, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.entries = 0
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS search (key TEXT PRIMARY KEY, split_length TEXT, log TEXT, used REAL)')
+
+    def key(self, runs: tuple, params: SearchParams) -> str:
+        return hashlib.sha256((json.dumps(list(params)) + '\n' + json.dumps(runs)).encode()).hexdigest()
+
+    def get(self, runs: tuple, params: SearchParams):
+        # Returns (split_length, log) of the search, or None if not cached.
+        key = self.key(runs, params)
+        row = self.connection.execute('SELECT split_length, log FROM search WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute('UPDATE search SET used = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0]), row[1]
+
+    def put(self, runs: tuple, params: SearchParams, split_length: list, log: str):
+        self.connection.execute('INSERT OR REPLACE INTO search VALUES (?, ?, ?, ?)', (self.key(runs, params), json.dumps(split_length), log, time.time()))
+
+    def close(self):
+        # Evict least recently used entries beyond the size limit, and save.
+        self.connection.execute('DELETE FROM search WHERE key IN (SELECT key FROM search ORDER BY used DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+        self.entries = self.connection.execute('SELECT COUNT(*) FROM search').fetchone()[0]
+        self.connection.commit()
+        self.connection.close()
+
+    def summary(self) -> str:
+        return f"Search cache {self.path}: {self.hits} hits, {self.misses} misses, {self.entries} entries"
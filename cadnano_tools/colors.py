@@ -0,0 +1,29 @@
+import random
+
+from cadnano_tools.model import StrandModel
+
+# Staple colours, shared by color-resetter.py and the recolour operation of cadnano_tools/pipeline.py.
+# Colours are integers of 0xRRGGBB, as stap_colors of cadnano2 JSON.
+
+def hex_color_to_int(hex_color: str) -> int:
+    # The leading '#' is optional.
+    return int(hex_color[1:] if hex_color.startswith('#') else hex_color, 16)
+
+def recolour_design(design, from_color: int = None, to_color: int = None):
+    # Random staple colours if neither colour is given, otherwise from_color is replaced by to_color. design is JSON dict or StrandModel.
+    rand_hex = lambda: int(16777215 * random.random())
+    randomise = from_color is None and to_color is None
+    if isinstance(design, StrandModel):
+        for colours in design.stap_colors:
+            for position, colour in colours.items():
+                if randomise:
+                    colours[position] = rand_hex()
+                elif colour == from_color:
+                    colours[position] = to_color
+        return
+    for vstrand in design['vstrands']:
+        for entry in vstrand['stap_colors']:
+            if randomise:
+                entry[1] = rand_hex()
+            elif entry[1] == from_color:
+                entry[1] = to_color
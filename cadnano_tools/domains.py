@@ -0,0 +1,60 @@
+from typing import NamedTuple
+
+# Domain composition of staples, as runs of bases from the 5' end. The domain string of domain_report.csv
+# (a-z for domains, A-Z for seeding domains, ^ for ssDNA region) is rendered only for the report.
+
+class DomainRun(NamedTuple):
+    # Continuous bases of the same domain. domain is the number of the domain from the 5' end, which is not advanced by ssDNA region.
+    # seed is True for the seeding domain, at least acceptable seed length.
+    domain: int
+    length: int
+    hybridised: bool
+    seed: bool
+
+class StapleDomains(NamedTuple):
+    # Domain report entry of a staple. Ends are (helix id, position), and runs are a tuple of DomainRun.
+    five_prime: tuple
+    three_prime: tuple
+    runs: tuple
+
+    @property
+    def length(self) -> int:
+        return sum(run.length for run in self.runs)
+
+    def line(self, nums: list) -> str:
+        # Line of domain_report.csv. Helix ids are written by num.
+        return (f'{nums[self.five_prime[0]]}[{self.five_prime[1]}],{nums[self.three_prime[0]]}[{self.three_prime[1]}],'
+                f'{render_domains(self.runs)},{self.length}')
+
+def domain_letter(run: DomainRun) -> str:
+    # The domain label circulates between a-z, and '!' after 1300 domains, as the original domain string.
+    if not run.hybridised:
+        return '^'
+    if run.domain >= 1300:
+        return '!'
+    letter = chr(97 + run.domain % 26)
+    return letter.upper() if run.seed else letter
+
+def render_domains(runs) -> str:
+    return ''.join(domain_letter(run) * run.length for run in runs)
+
+def core_length(runs) -> int:
+    # Length excluding ssDNA region at both ends.
+    hybridised = [i for i, run in enumerate(runs) if run.hybridised]
+    if not hybridised:
+        return 0
+    return sum(run.length for run in runs[hybridised[0]:hybridised[-1] + 1])
+
+def base_keys(runs) -> list:
+    # Key of every base, equal for bases of the same domain with the same seed class, and -1 for ssDNA region.
+    keys = []
+    for run in runs:
+        keys.extend([run.domain * 2 + run.seed if run.hybridised else -1] * run.length)
+    return keys
+
+def to_json(staple: StapleDomains) -> list:
+    return [list(staple.five_prime), list(staple.three_prime), [list(run) for run in staple.runs]]
+
+def from_json(data: list) -> StapleDomains:
+    five_prime, three_prime, runs = data
+    return StapleDomains(tuple(five_prime), tuple(three_prime), tuple(DomainRun(domain, length, bool(hybridised), bool(seed)) for domain, length, hybridised, seed in runs))
@@ -0,0 +1,105 @@
+import hashlib
+import json
+
+from cadnano_tools.model import StrandModel
+from cadnano_tools.domains import to_json, from_json
+from cadnano_tools.jsonio import load_json, save_json
+
+# State file of semi-autobreak.py, to reuse the result of the previous run for staples untouched by edits.
+# It records the options, the hash of the written output.json and, for every staple of the output (by 5' end),
+# the connected staple (group) it was broken from, its domain report entry, its short domains and whether its search was truncated by the budget.
+STATE_VERSION = 3
+
+def file_hash(filename: str) -> str:
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def save_state(filename: str, options: list, output_file: str, groups: dict, records: dict, truncated=None):
+    # groups: {(helix id, 5' position): group}, records: {(helix id, 5' position): (StapleDomains, short domain helix ids)}, truncated: {(helix id, 5' position)} or None
+    truncated = truncated or set()
+    staples = [[helix_id, pos, groups[(helix_id, pos)], to_json(staple), short_domains, (helix_id, pos) in truncated] for (helix_id, pos), (staple, short_domains) in records.items()]
+    save_json(filename, {'version': STATE_VERSION, 'options': options, 'output_hash': file_hash(output_file), 'staples': staples})
+
+def load_state(filename: str, options: list, previous_file: str):
+    # Returns the state, or None with the reason printed if the previous run is not reusable.
+    try:
+        state = load_json(filename)
+    except (FileNotFoundError, json.JSONDecodeError):
+        print(f"State file {filename} is not found or broken.")
+        return None
+    if state.get('version') != STATE_VERSION or state['options'] != options:
+        print(f"State file {filename} was recorded with different options.")
+        return None
+    if state['output_hash'] != file_hash(previous_file):
+        print(f"{previous_file} is not the output recorded in {filename}. Save edited design as another file.")
+        return None
+    state['groups'] = {(helix_id, pos): group for helix_id, pos, group, _, _, _ in state['staples']}
+    state['records'] = {(helix_id, pos): (from_json(staple), short_domains) for helix_id, pos, _, staple, short_domains, _ in state['staples']}
+    state['truncated'] = {(helix_id, pos) for helix_id, pos, _, _, _, truncated in state['staples'] if truncated}
+    return state
+
+def same_layout(model: StrandModel, previous: StrandModel) -> bool:
+    return model.nums == previous.nums and model.length == previous.length
+
+def changed_bases(model: StrandModel, previous: StrandModel) -> set:
+    # (helix id, position) of bases whose scaffold or staple pointers, or staple colour at 5' end, differ from the previous output.
+    # Adjacent bases are included, as autoconnect may join a staple to its neighbour at the changed base.
+    changed = set()
+    for helix_id in range(model.helix_count):
+        start = model.index(helix_id, 0)
+        end = model.index(helix_id + 1, 0)
+        positions = set()
+        if model.scaf[start:end] != previous.scaf[start:end] or model.stap[start:end] != previous.stap[start:end]:
+            for pos in range(model.length):
+                i = start + pos * 4
+                if model.scaf[i:i + 4] != previous.scaf[i:i + 4] or model.stap[i:i + 4] != previous.stap[i:i + 4]:
+                    positions.add(pos)
+        colours = model.stap_colors[helix_id]
+        previous_colours = previous.stap_colors[helix_id]
+        if colours != previous_colours:
+            positions.update(pos for pos in colours.keys() | previous_colours.keys() if colours.get(pos) != previous_colours.get(pos))
+        for pos in positions:
+            changed.update((helix_id, neighbour) for neighbour in (pos - 1, pos, pos + 1) if 0 <= neighbour < model.length)
+    return changed
+
+def five_prime_end(model: StrandModel, helix_id: int, pos: int):
+    # 5' end of the staple at the base, None for circular staple. The base without staple returns itself only if it is listed in stap_colors.
+    stap = model.stap
+    tracer_hel = helix_id
+    tracer_pos = pos
+    i = model.index(tracer_hel, tracer_pos)
+    if stap[i] == -1 and stap[i + 2] == -1:
+        return (helix_id, pos) if pos in model.stap_colors[helix_id] else False
+    while stap[i] != -1:
+        tracer_hel = stap[i]
+        tracer_pos = stap[i + 1]
+        if (tracer_hel, tracer_pos) == (helix_id, pos):
+            return None
+        i = model.index(tracer_hel, tracer_pos)
+    return tracer_hel, tracer_pos
+
+def dirty_staples(model: StrandModel, previous: StrandModel, state: dict):
+    # 5' ends of staples in the new design to be processed again: staples containing changed bases,
+    # and all staples broken from the same connected staple in the previous run. None if a circular staple is found.
+    groups = state['groups']
+    dirty_groups = set()
+    dirty_ends = set()
+    for helix_id, pos in changed_bases(model, previous):
+        for design in (model, previous):
+            end = five_prime_end(design, helix_id, pos)
+            if end is None:
+                return None
+            if end is False:
+                continue
+            if end in groups:
+                dirty_groups.add(groups[end])
+            if design is model:
+                dirty_ends.add(end)
+    for helix_id in range(model.helix_count):
+        for pos in model.stap_colors[helix_id]:
+            if (helix_id, pos) not in groups or groups[(helix_id, pos)] in dirty_groups:
+                dirty_ends.add((helix_id, pos))
+    return dirty_ends
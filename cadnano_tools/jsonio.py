@@ -0,0 +1,43 @@
+import gzip
+import json
+
+try:
+    import orjson
+except ImportError:     # stdlib json is used instead
+    orjson = None
+
+# JSON files of all tools. orjson is used when installed, with the same results as stdlib json (its JSONDecodeError is a subclass of
+# json.JSONDecodeError). Output is compact (no spaces) unless indent is given. gzip-compressed files are read transparently, and files
+# named *.gz are written compressed.
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+def loads(data):
+    # data is str or bytes.
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def dumps(data, indent=None) -> bytes:
+    # orjson does not take non-str dict keys, namedtuple or indent other than 2, which are left to stdlib json.
+    if orjson and indent in (None, 2):
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+        except TypeError:
+            pass
+    return json.dumps(data, indent=indent, separators=(',', ': ') if indent else (',', ':')).encode()
+
+def read_bytes(filename: str) -> bytes:
+    with open(filename, 'rb') as f:
+        data = f.read()
+    return gzip.decompress(data) if data[:2] == GZIP_MAGIC else data
+
+def load_json(filename: str):
+    return loads(read_bytes(filename))
+
+def open_output(filename: str):
+    # Binary file to write, compressed if named *.gz. Also for output streamed in parts.
+    return gzip.open(filename, 'wb', compresslevel=6) if filename.endswith('.gz') else open(filename, 'wb')
+
+def save_json(filename: str, data, indent=None):
+    data = dumps(data, indent)
+    with open_output(filename) as f:
+        f.write(data)
@@ -0,0 +1,47 @@
+from cadnano_tools.model import StrandModel
+
+EMPTY_BASE = [-1, -1, -1, -1]
+
+class LatticeIndex:
+    # Index of helices by (row, col) on the lattice, with the emptiness and the occupied position range of each helix computed once per design.
+    # Helices are referred by helix id (index in vstrands), and the neighbour lookup is constant time.
+    # Without occupied, for tools looking up helices only by place (e.g. mirror and copies of designs), every helix counts as non-empty.
+    def __init__(self, rows: list, cols: list, occupied=None):
+        self.rows = rows
+        self.cols = cols
+        self.occupied = occupied    # (first, last + 1) positions of scaffold or staple on each helix, None if the helix is empty
+        self.helix_at = {}      # the first helix at each place
+        for helix_id, place in enumerate(zip(rows, cols)):
+            self.helix_at.setdefault(place, helix_id)
+
+    @classmethod
+    def from_model(cls, model: StrandModel):
+        return cls(model.rows, model.cols, [model.occupied_range(helix_id) for helix_id in range(model.helix_count)])
+
+    @classmethod
+    def from_vstrands(cls, vstrands: list, occupancy=False):
+        # For tools working on JSON dict directly. The occupied range of each helix is computed only with occupancy.
+        occupied = None
+        if occupancy:
+            occupied = []
+            for vstrand in vstrands:
+                filled = [pos for pos in range(len(vstrand['scaf'])) if vstrand['scaf'][pos] != EMPTY_BASE or vstrand['stap'][pos] != EMPTY_BASE]
+                occupied.append((filled[0], filled[-1] + 1) if filled else None)
+        return cls([vstrand['row'] for vstrand in vstrands], [vstrand['col'] for vstrand in vstrands], occupied)
+
+    def is_empty(self, helix_id: int) -> bool:
+        return self.occupied is not None and self.occupied[helix_id] is None
+
+    def places(self):
+        return self.helix_at.keys()
+
+    def neighbours(self, helix_id: int) -> list:
+        # Non-empty helices adjacent on the honeycomb lattice, in ascending order of helix id. Empty helix has no neighbour.
+        if self.is_empty(helix_id):
+            return []
+        row = self.rows[helix_id]
+        col = self.cols[helix_id]
+        # if neighbour is triangle (row + col is even) arrangement, the third one is upper row. Lower row if reverse triangle arrangement.
+        facing_row = row - 1 if (row + col) % 2 == 0 else row + 1
+        candidates = [self.helix_at.get(place) for place in ((row, col - 1), (row, col + 1), (facing_row, col))]
+        return sorted(candidate for candidate in candidates if candidate is not None and not self.is_empty(candidate))
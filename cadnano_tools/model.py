@@ -0,0 +1,112 @@
+from array import array
+
+STRAND_KEYS = ('scaf', 'stap', 'loop', 'skip', 'stap_colors')    # vstrand keys held as arrays in StrandModel
+
+class StrandModel:
+    # Compact in-memory form of a cadnano2 design.
+    # scaf/stap are contiguous int32 arrays of helix x position x 4 ([5' helix, 5' position, 3' helix, 3' position] of each base),
+    # where helices are pointed by their index in vstrands (helix id) instead of num. loop/skip are helix x position int32 arrays.
+    # stap_colors is a list of {5' end position: colour} per helix id, kept in the order of the JSON file.
+    # The base at (helix id h, position p) starts at index (h * length + p) * 4 of scaf/stap, and h * length + p of loop/skip.
+    # The arrays are int32 memoryviews instead of arrays when the model is memory-mapped from a sidecar (from_arrays).
+    def __init__(self, blueprint: dict):
+        vstrands = blueprint['vstrands']
+        self.header = {key: None if key == 'vstrands' else value for key, value in blueprint.items()}   # vstrands is rebuilt at the same place
+        self.vstrand_keys = [list(vstrand.keys()) for vstrand in vstrands]
+        self.extra = [{key: value for key, value in vstrand.items() if key not in STRAND_KEYS} for vstrand in vstrands]  # num, row, col, scafLoop, stapLoop, etc.
+        self.length = len(vstrands[0]['scaf']) if vstrands else 0
+        self.set_helices()
+        self.scaf = self.pack_strands(vstrands, 'scaf')
+        self.stap = self.pack_strands(vstrands, 'stap')
+        self.loop = array('i', [value for vstrand in vstrands for value in vstrand['loop']])
+        self.skip = array('i', [value for vstrand in vstrands for value in vstrand['skip']])
+        self.stap_colors = [{position: colour for position, colour in vstrand['stap_colors']} for vstrand in vstrands]
+
+    @classmethod
+    def from_arrays(cls, header: dict, vstrand_keys: list, extra: list, length: int, scaf, stap, loop, skip, stap_colors: list):
+        # Model of already packed arrays and the other attributes as above, without JSON parsing.
+        model = cls.__new__(cls)
+        model.header = header
+        model.vstrand_keys = vstrand_keys
+        model.extra = extra
+        model.length = length
+        model.set_helices()
+        model.scaf = scaf
+        model.stap = stap
+        model.loop = loop
+        model.skip = skip
+        model.stap_colors = stap_colors
+        return model
+
+    def set_helices(self):
+        self.helix_count = len(self.extra)
+        self.nums = [extra['num'] for extra in self.extra]
+        self.rows = [extra['row'] for extra in self.extra]
+        self.cols = [extra['col'] for extra in self.extra]
+        self.num2id = {num: i for i, num in enumerate(self.nums)}
+
+    def pack_strands(self, vstrands: list, key: str) -> array:
+        num2id = dict(self.num2id)
+        num2id[-1] = -1
+        packed = array('i', bytes(4 * 4 * self.length * self.helix_count))
+        i = 0
+        for vstrand in vstrands:
+            for prev_hel, prev_pos, next_hel, next_pos in vstrand[key]:
+                packed[i] = num2id[prev_hel]
+                packed[i + 1] = prev_pos
+                packed[i + 2] = num2id[next_hel]
+                packed[i + 3] = next_pos
+                i += 4
+        return packed
+
+    def unpack_strands(self, strands: array, helix_id: int) -> list:
+        id2num = self.nums + [-1]   # index -1 is translated to -1
+        start = helix_id * self.length * 4
+        end = start + self.length * 4
+        return [[id2num[strands[i]], strands[i + 1], id2num[strands[i + 2]], strands[i + 3]] for i in range(start, end, 4)]
+
+    def index(self, helix_id: int, pos: int) -> int:
+        # Index of the base in scaf/stap arrays
+        return (helix_id * self.length + pos) * 4
+
+    def occupied_range(self, helix_id: int):
+        # (first, last + 1) positions where scaffold or staple exists on the helix, None if the helix is empty.
+        start = self.index(helix_id, 0)
+        end = self.index(helix_id + 1, 0)
+        empty = b'\xff' * (4 * (end - start))    # all int32 -1
+        if self.scaf[start:end].tobytes() == empty and self.stap[start:end].tobytes() == empty:
+            return None
+        first = 0
+        while self.is_empty_base(helix_id, first):
+            first += 1
+        last = self.length - 1
+        while self.is_empty_base(helix_id, last):
+            last -= 1
+        return first, last + 1
+
+    def is_empty_base(self, helix_id: int, pos: int) -> bool:
+        i = self.index(helix_id, pos)
+        return self.scaf[i] == self.scaf[i + 1] == self.scaf[i + 2] == self.scaf[i + 3] == self.stap[i] == self.stap[i + 1] == self.stap[i + 2] == self.stap[i + 3] == -1
+
+    def set_colour(self, helix_id: int, pos: int, colour: int):
+        # Add a staple 5' end, keeping stap_colors in ascending order of position.
+        colours = self.stap_colors[helix_id]
+        colours[pos] = colour
+        self.stap_colors[helix_id] = dict(sorted(colours.items()))
+
+    def to_blueprint(self) -> dict:
+        # Converts back to cadnano2 JSON dict, with the same key order as the loaded file.
+        vstrands = []
+        for helix_id in range(self.helix_count):
+            start = helix_id * self.length
+            arrays = {
+                'scaf': self.unpack_strands(self.scaf, helix_id),
+                'stap': self.unpack_strands(self.stap, helix_id),
+                'loop': self.loop[start:start + self.length].tolist(),
+                'skip': self.skip[start:start + self.length].tolist(),
+                'stap_colors': [[position, colour] for position, colour in self.stap_colors[helix_id].items()],
+            }
+            vstrands.append({key: arrays[key] if key in arrays else self.extra[helix_id][key] for key in self.vstrand_keys[helix_id]})
+        blueprint = dict(self.header)
+        blueprint['vstrands'] = vstrands
+        return blueprint
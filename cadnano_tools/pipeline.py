@@ -0,0 +1,84 @@
+import os
+
+from cadnano_tools.model import StrandModel
+from cadnano_tools.autobreak import AutobreakConfig, trace_design, autoconnect_design, autobreak_design, write_outputs
+from cadnano_tools.transform import TransformPlan, parse_operation as parse_transform, run_operation as run_transform
+from cadnano_tools.jsonio import save_json
+from cadnano_tools.colors import hex_color_to_int, recolour_design
+
+# Ordered operations on one design held in memory, for design-pipeline.py: the design is parsed once and only the final files are written.
+# The design is kept as JSON dict for recolouring, as TransformPlan for geometric transforms (consecutive ones are composed into one plan)
+# and as StrandModel for the analysis, and converted in memory only when the next operation needs another form.
+
+TRANSFORMS = ('slide', 'crop', 'autocrop', 'mirror', 'multiply')
+ANALYSES = ('trace', 'autoconnect', 'autobreak')
+OPERATIONS = ('recolour',) + TRANSFORMS + ANALYSES
+
+def parse_operation(text: str) -> tuple:
+    # Transforms as cadnano_tools.transform.parse_operation, 'recolour' (random colours), 'recolour:#FF0000:#0066CC' (target and new colour),
+    # 'trace', 'autoconnect' and 'autobreak'.
+    name, *values = text.split(':')
+    name = 'recolour' if name == 'recolor' else name
+    if name in TRANSFORMS:
+        return parse_transform(text)
+    if name == 'recolour':
+        if len(values) not in (0, 2):
+            raise ValueError(f'recolour takes no colour (random colours) or target and new colours, e.g. recolour:#FF0000:#0066CC, not {text}')
+        try:
+            return name, [hex_color_to_int(value) for value in values]
+        except ValueError:
+            raise ValueError(f'colours of {text} should be hex color codes')
+    if name in ANALYSES and not values:
+        return name, []
+    raise ValueError(f'unknown operation {text}, choose from {", ".join(OPERATIONS)}')
+
+class Pipeline:
+    def __init__(self, design, config: AutobreakConfig):
+        self.design = design    # JSON dict, TransformPlan or StrandModel
+        self.config = config
+        self.result = None      # AutobreakResult of the last analysis, None if the design is changed after it
+
+    def blueprint(self) -> dict:
+        if isinstance(self.design, TransformPlan):
+            self.design = self.design.apply()
+        elif isinstance(self.design, StrandModel):
+            self.design = self.design.to_blueprint()
+        return self.design
+
+    def model(self) -> StrandModel:
+        if not isinstance(self.design, StrandModel):
+            self.design = StrandModel(self.blueprint())
+        return self.design
+
+    def run(self, name: str, values: list):
+        if name in TRANSFORMS:
+            if not isinstance(self.design, TransformPlan):
+                self.design = TransformPlan(self.blueprint())
+            run_transform(self.design, name, values)
+            self.result = None
+        elif name == 'recolour':
+            if isinstance(self.design, TransformPlan):
+                self.blueprint()
+            recolour_design(self.design, *values)
+            self.result = None
+        elif name == 'trace':
+            self.result = trace_design(self.model(), self.config)
+        elif name == 'autoconnect':
+            self.result = autoconnect_design(self.model(), self.config)
+        else:
+            self.result = autobreak_design(self.model(), self.config)
+        return self
+
+    def write(self, outputs: set, directory='.'):
+        # Requested files among 'json', 'domain' and 'crossover'. Reports are written only if the last analysis is of the final design.
+        reports = outputs & {'domain', 'crossover'}
+        if reports and self.result is None:
+            print(f"{' and '.join(sorted(reports))} report is not written, as the design is not analysed after the last change. Add trace at the end.")
+        if self.result is not None:
+            write_outputs(self.result, outputs, directory)
+        elif 'json' in outputs:
+            filename = os.path.join(directory, 'output.json')
+            if isinstance(self.design, TransformPlan):
+                self.design.write(filename)
+            else:
+                save_json(filename, self.blueprint())
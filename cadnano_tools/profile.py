@@ -0,0 +1,50 @@
+import contextlib
+import time
+
+from cadnano_tools.jsonio import save_json
+
+# Profile of a semi-autobreak.py run (-profile): wall-clock time of each phase and the search statistics of each staple,
+# written as JSON. A Profile is passed to the functions of a run, and nothing is recorded when None is passed.
+
+PHASES = ['load', 'autoconnect', 'trace', 'search', 'break', 'crossover_report', 'write']
+
+class Profile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)    # seconds
+        self.staples = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_staple(self, staple: str, length: int, source: str, stats):
+        # source is 'search', 'cache' (no statistics) or 'shared' (the same domains as a staple searched before in this run).
+        record = {'staple': staple, 'length': length, 'source': source}
+        if stats is not None:
+            record.update(stats._asdict())
+            record['time_ms'] = 0 if source == 'shared' else round(stats.time_ms, 3)
+        self.staples.append(record)
+
+    def to_dict(self, **info) -> dict:
+        searched = [record for record in self.staples if record['source'] == 'search']
+        summary = {'staples': len(self.staples), 'searched': len(searched), 'cached': sum(record['source'] == 'cache' for record in self.staples),
+                   'truncated': sum(not record['completed'] for record in searched), 'search_ms': round(sum(record['time_ms'] for record in searched), 3),
+                   'slowest': sorted(searched, key=lambda record: record['time_ms'], reverse=True)[:10]}
+        phases = {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()}
+        phases['total'] = round((time.perf_counter() - self.started) * 1000, 3)
+        return {**info, 'phases_ms': phases, 'summary': summary, 'staples': self.staples}
+
+    def write(self, filename: str, **info):
+        save_json(filename, self.to_dict(**info), indent=1)
+
+def timed(profile, name: str):
+    # Context manager timing the phase if profiling, otherwise doing nothing.
+    return profile.phase(name) if profile else contextlib.nullcontext()
@@ -0,0 +1,358 @@
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from operator import and_, eq, ne
+from typing import NamedTuple
+
+from cadnano_tools.domains import base_keys, domain_letter
+
+class SearchParams(NamedTuple):
+    # Parameters of the breaking pattern search. Defaults are the same as the command line options of semi-autobreak.py.
+    min_length: int = 18
+    max_length: int = 80
+    optimal_seed_len: int = 14
+    acceptable_seed_len: int = 12
+    distance: int = 3
+    penalty_rate: float = 0.3
+    limit_num: int = 5000
+    filter_num: int = 100
+    beam: bool = False
+
+class SearchStats(NamedTuple):
+    # Statistics of the search of a staple, recorded by -profile. For the exact search, generated is the number of valid splits,
+    # pruned the split positions rejected by the criteria and depth the number of split strands of the result.
+    # For the beam search, generated is the number of patterns, pruned the patterns dropped by the filter and depth the search iterations.
+    completed: bool
+    generated: int
+    pruned: int
+    depth: int
+    time_ms: float = 0
+
+class DomainTable:
+    # Run-length and prefix tables of the domain runs (DomainRun) of a staple, built once per staple.
+    # Any split [start:end] of the staple is validated and scored in constant time, without slicing the domains.
+    def __init__(self, runs: tuple, distance: int):
+        seq_len = sum(run.length for run in runs)
+        self.length = seq_len
+        # Seeding domains, and the runs fully contained by any range are looked up by run index.
+        self.run_start = []
+        self.run_end = []
+        self.run_of = [-1] * seq_len        # index of the run containing each position, -1 if not in a seeding domain
+        self.runs_from = [0] * (seq_len + 1)   # number of runs starting before the position = index of the first run starting at/after it
+        self.runs_until = [0] * (seq_len + 1)  # number of runs ending at/before the position
+        # Hybridised (non ssDNA) positions: first one at/after the position, and the end of the last one before the position.
+        self.core_from = [seq_len] * (seq_len + 1)
+        self.core_until = [0] * (seq_len + 1)
+        pos = 0
+        for run in runs:
+            end = pos + run.length
+            if run.seed:
+                self.run_of[pos:end] = [len(self.run_start)] * run.length
+                self.run_start.append(pos)
+                self.run_end.append(end)
+            self.core_until[pos + 1:end + 1] = range(pos + 1, end + 1) if run.hybridised else [self.core_until[pos]] * run.length
+            pos = end
+        for run in reversed(runs):
+            start = pos - run.length
+            self.core_from[start:pos] = range(start, pos) if run.hybridised else [self.core_from[pos]] * run.length
+            pos = start
+        for run_id, start in enumerate(self.run_start):
+            self.runs_from[pos:start + 1] = [run_id] * (start + 1 - pos)
+            pos = start + 1
+        self.runs_from[pos:] = [len(self.run_start)] * (seq_len + 1 - pos)
+        pos = 0
+        for run_id, end in enumerate(self.run_end):
+            self.runs_until[pos:end] = [run_id] * (end - pos)
+            pos = end
+        self.runs_until[pos:] = [len(self.run_end)] * (seq_len + 1 - pos)
+        # Sparse table of the longest run among 2**level consecutive runs, for constant time range maximum.
+        self.sparse = [[end - start for start, end in zip(self.run_start, self.run_end)]]
+        level = 1
+        while 2 ** level <= len(self.run_start):
+            previous = self.sparse[-1]
+            half = 2 ** (level - 1)
+            self.sparse.append([max(previous[j], previous[j + half]) for j in range(len(previous) - half)])
+            level += 1
+        # Breaking point is in the middle of the continuous domain, twice length as the distance specified, and not in ssDNA region.
+        self.breakable = [False] * (seq_len + 1)
+        if seq_len >= 2 * distance:
+            keys = base_keys(runs)
+            self.breakable[distance:seq_len - distance + 1] = map(and_, map(eq, keys[:seq_len - 2 * distance + 1], keys[2 * distance - 1:]), map(ne, keys[distance:seq_len - distance + 1], repeat(-1)))
+
+    def seed_len(self, start: int, end: int) -> int:
+        # Longest continuous seeding domain within [start:end]. Runs cut by the range ends are shortened.
+        if start >= end:
+            return 0
+        longest = 0
+        if self.run_of[start] != -1:
+            longest = min(self.run_end[self.run_of[start]], end) - start
+        if self.run_of[end - 1] != -1:
+            longest = max(longest, end - max(self.run_start[self.run_of[end - 1]], start))
+        first = self.runs_from[start]
+        last = self.runs_until[end] - 1
+        if first <= last:
+            level = (last - first + 1).bit_length() - 1
+            longest = max(longest, self.sparse[level][first], self.sparse[level][last - 2 ** level + 1])
+        return longest
+
+    def core_len(self, start: int, end: int) -> int:
+        # Length of [start:end] excluding ssDNA region at both ends.
+        return max(0, self.core_until[end] - self.core_from[start])
+
+def score_split(length: int, seed_len: int, params: SearchParams) -> float:
+    if seed_len >= params.optimal_seed_len:
+        seeding_domain = 1
+    elif seed_len >= params.acceptable_seed_len:
+        seeding_domain = params.penalty_rate  # 0.3 fold default penalty to acceptable strand
+    else:
+        seeding_domain = 0
+    return seeding_domain * (2 - (length - params.min_length) / (params.max_length - params.min_length))  # length penalty: Max length gets half score than min length. Besides, shorter split gives more number of split strands each of them has score (gaining up total score).
+
+def autobreak_search(runs: tuple, params: SearchParams, out=None, budget_ms=0) -> tuple[list, SearchStats]:
+    # Returns split lengths from 5' end, except the last one, of the staple given by domain runs, and the statistics of the search.
+    # Exact search is used unless legacy beam search is specified. Messages are printed to out (sys.stdout if None).
+    # With budget_ms, the search is stopped after the time and the best pattern found so far is returned as truncated (not completed).
+    started = time.perf_counter()
+    table = DomainTable(runs, params.distance)
+    deadline = started + budget_ms / 1000 if budget_ms > 0 else None
+    if params.beam:
+        split_length, stats = beam_search(runs, table, params, out, deadline)
+    else:
+        split_length, stats = exact_search(table, params, out, deadline)
+    return split_length, stats._replace(time_ms=(time.perf_counter() - started) * 1000)
+
+def split_score(table: DomainTable, params: SearchParams, start: int, pos: int) -> float:
+    # Score of the split [start:pos] if breaking at pos is valid for the remaining sequence [start:], otherwise 0.
+    if not table.breakable[pos] or table.core_len(start, pos) < params.min_length or table.core_len(pos, table.length) < params.min_length:
+        return 0
+    if not score_split(table.length - pos, table.seed_len(pos, table.length), params):
+        return 0
+    return score_split(pos - start, table.seed_len(start, pos), params)
+
+def complete_truncated(table: DomainTable, params: SearchParams, best: list, frontier: int, pos=0, score=0, split_length=()):
+    # Pattern of the search stopped by the budget. For the exact search, the best patterns of suffixes after frontier are solved,
+    # and the unsolved 5' side is broken greedily, preferring the split joined to a solved suffix. For the beam search (frontier at the 3' end),
+    # the remaining sequence of the partial pattern (split at pos with the score) is broken greedily. Returns (score, split lengths) or None.
+    split_length = list(split_length)
+    while pos <= frontier:
+        remaining_len = table.length - pos
+        choice = None   # ((joined to solved suffix, score), split length)
+        for k in range(params.min_length, min(params.max_length + 1, remaining_len - params.min_length) + 1):
+            upstream_score = split_score(table, params, pos, pos + k)
+            if not upstream_score:
+                continue
+            if pos + k > frontier:
+                if best[pos + k] is None:
+                    continue
+                key = (True, upstream_score + best[pos + k][0])
+            else:
+                key = (False, upstream_score)
+            if choice is None or key > choice[0]:
+                choice = (key, k)
+        if choice is None:  # left unbroken if it is not too long
+            if remaining_len > params.max_length:
+                return None
+            return score + score_split(remaining_len, table.seed_len(pos, table.length), params), split_length + [remaining_len]
+        k = choice[1]
+        score += score_split(k, table.seed_len(pos, pos + k), params)
+        split_length.append(k)
+        pos += k
+    score += best[pos][0]
+    while pos < table.length:
+        split_length.append(best[pos][2])
+        pos += best[pos][2]
+    return score, split_length
+
+def exact_search(table: DomainTable, params: SearchParams, out=None, deadline=None) -> tuple[list, SearchStats]:
+    # The score of a breaking pattern is the sum of split strand scores, and the valid splits only depend on the remaining sequence.
+    # Therefore the best pattern of every remaining sequence (suffix) is solved once, from 3' end to 5' end (dynamic programming).
+    # The same criteria as the beam search is applied, without limit/filter, so the score is the highest among all patterns.
+    # Ties are resolved to fewer splits and then shorter 5' split, so the pattern can differ from the one of the same score picked by the beam search.
+    min_length = params.min_length
+    max_length = params.max_length
+    seq_len = table.length
+    best = [None] * (seq_len + 1)   # (score, number of splits, first split length) of the best pattern of each suffix. None if no pattern meets the criteria.
+    frontier = -1   # the last unsolved position, when the search is truncated
+    tried = 0   # split positions
+    generated = 0   # valid splits
+    for start in range(seq_len - 1, -1, -1):
+        if deadline and time.perf_counter() > deadline:
+            frontier = start
+            break
+        remaining_len = seq_len - start
+        candidate = None
+        tried += max(0, min(max_length + 1, remaining_len - min_length) + 1 - min_length)
+        for k in range(min_length, min(max_length + 1, remaining_len - min_length) + 1):
+            pos = start + k     # breaking point
+            if not table.breakable[pos]:
+                continue
+            upstream_score = score_split(k, table.seed_len(start, pos), params)
+            if not (upstream_score and score_split(seq_len - pos, table.seed_len(pos, seq_len), params)):
+                continue
+            if table.core_len(start, pos) < min_length or table.core_len(pos, seq_len) < min_length:
+                continue
+            # This split is valid, so the remaining sequence is never left unbroken.
+            generated += 1
+            if candidate is None:
+                candidate = False
+            if best[pos] is None:
+                continue
+            score = upstream_score + best[pos][0]
+            splits = best[pos][1] + 1
+            if not candidate or score > candidate[0] + 1e-9 or (score > candidate[0] - 1e-9 and splits < candidate[1]):   # tolerance absorbs rounding error of summation order
+                candidate = (score, splits, k)
+        if candidate is None:  # no valid split, left unbroken if it is not too long
+            if remaining_len <= max_length:
+                best[start] = (score_split(remaining_len, table.seed_len(start, seq_len), params), 1, remaining_len)
+        elif candidate:
+            best[start] = candidate
+
+    if frontier != -1:
+        print(f"search truncated by budget with {frontier + 1} of {seq_len} bases from 5' end unsolved", file=out)
+        truncated = complete_truncated(table, params, best, frontier)
+        if truncated is None:
+            print("skipped as no patterns were found within budget. manual breaking required", file=out)
+            return [], SearchStats(False, generated, tried - generated, 0)
+        score, split_length = truncated
+        if len(split_length) > 1:
+            print(f"break to {split_length} score: {score:.4f}, best among breaking patterns found within budget", file=out)
+        else:
+            print("left as " + str(split_length) + " score: " + str(score), file=out)
+        return split_length[:-1], SearchStats(False, generated, tried - generated, len(split_length))
+    if best[0] is None:
+        print("skipped as no patterns met given criteria. manual breaking required", file=out)
+        return [], SearchStats(True, generated, tried - generated, 0)
+    split_length = []
+    pos = 0
+    while pos < seq_len:
+        split_length.append(best[pos][2])
+        pos += best[pos][2]
+    if len(split_length) > 1:
+        print(f"break to {split_length} score: {best[0][0]:.4f}, highest among all breaking patterns", file=out)
+    else:
+        print("left as " + str(split_length) + " score: " + str(best[0][0]), file=out)
+    return split_length[:-1], SearchStats(True, generated, tried - generated, len(split_length))
+
+def beam_search(runs: tuple, table: DomainTable, params: SearchParams, out=None, deadline=None) -> tuple[list, SearchStats]:
+    min_length = params.min_length
+    max_length = params.max_length
+    acceptable_seed_len = params.acceptable_seed_len
+    optimal_seed_len = params.optimal_seed_len
+    # Average length of domains, between the first and the last hybridised bases. Each base of ssDNA region counts as a domain.
+    # The first domain is counted with an empty domain before it, unless it is labelled 'a'.
+    hybridised = [i for i, run in enumerate(runs) if run.hybridised]
+    middle_runs = runs[hybridised[0]:hybridised[-1] + 1] if hybridised else ()
+    domain_count = sum(1 if run.hybridised else run.length for run in middle_runs)
+    if not (middle_runs and domain_letter(middle_runs[0]) == 'a'):
+        domain_count += 1
+    average_domain_length = sum(run.length for run in middle_runs) / domain_count
+    output_string = f'limit/filter weight: ^({acceptable_seed_len/average_domain_length:.3f}) is applied.' if average_domain_length > acceptable_seed_len else ''
+    print(f"average domain length is {average_domain_length:.3f}. {output_string}", file=out)
+    seq_len = table.length
+    def score_seq(start: int, end: int) -> float:
+        return score_split(end - start, table.seed_len(start, end), params)
+
+    patterns = [{'split_length': [], 'score': 0, 'start': 0}]   # Initial state of the "patterns" list. The remaining sequence is input_seq[start:].
+    completed = False   # Flag to indicate if the all search is completed
+    final_patterns = [] # List to store patterns that are completed
+
+    truncated = False   # by the budget, when the best pattern under search is completed greedily
+    generated = 0
+    pruned = 0
+    depth = 0
+    while not completed:
+        depth += 1
+        new_patterns = []
+        for pattern in patterns:
+            if deadline and time.perf_counter() > deadline:
+                truncated = True
+                break
+            start = pattern['start']
+
+            # If the remaining sequence (excluding single strand region) is less than min_length, consider this specific pattern completed
+            if table.core_len(start, seq_len) < min_length:
+                final_patterns.append(pattern)
+                continue    # completed tag is not set at this point, to keep searching from other patterns.
+
+            # If there's no valid split for this pattern, also consider it completed
+            valid_split_found = False
+            for k in range(min_length, min(max_length + 1, seq_len - start - min_length) + 1):
+                pos = start + k
+                if (
+                    table.breakable[pos] and # Breaking point is in the middle of the continuous domain, and loop and brush are excluded from breaking points
+                    score_seq(start, pos) and # Score of the upstream strand should be larger than 0
+                    score_seq(pos, seq_len) and # Score of the downstream strand should be larger than 0
+                    table.core_len(start, pos) >= min_length and # Core length of the upstream strand should be larger than min_length
+                    table.core_len(pos, seq_len) >= min_length # Core length of the upstream strand should be larger than min_length
+                ): # minimum logic to avoid loop break is added.
+                    valid_split_found = True
+                    split_length = pattern['split_length'] + [k]
+                    score = pattern['score'] + score_seq(start, pos)
+                    new_patterns.append({'split_length': split_length, 'score': score, 'start': pos})
+
+            if not valid_split_found:
+                final_patterns.append(pattern)
+        if truncated:
+            generated += len(new_patterns)
+            under_search = new_patterns + patterns
+            print(f'search truncated by budget with {len(under_search)} patterns under search', file=out)
+            pattern = max(under_search, key=lambda x: x['score'])
+            completion = complete_truncated(table, params, None, seq_len, pattern['start'], pattern['score'], pattern['split_length'])
+            if completion is not None:
+                final_patterns.append({'split_length': completion[1], 'score': completion[0], 'start': seq_len})
+            break
+        if average_domain_length > 0:
+            weight_limit = int(params.limit_num ** (min(1, optimal_seed_len/average_domain_length))) # if the strand is continuous sequence, apply weight to limit to reduce wasteful calculation
+            weight_filter = int(params.filter_num ** (min(1, optimal_seed_len/average_domain_length))) # if the strand is continuous sequence, apply weight to limit to reduce wasteful calculation
+        else:
+            weight_limit = 1
+            weight_filter = 1
+        generated += len(new_patterns)
+        if not new_patterns:  # No new patterns found in this iteration
+            completed = True
+        elif len(new_patterns) > weight_limit:  # for each cycle, if the pattern exceed limit, filtered to top 1000th score, with risk of listing local optimum.
+            print(f'calculation is filtered to top {weight_filter} patterns as pattern limit reached: {len(new_patterns)}/{weight_limit}', file=out)
+            print(f'found {len(final_patterns)} breaking patterns and still searching from rest {len(new_patterns)} patterns ...', file=out)
+            top_scored_patterns = sorted(new_patterns, key=lambda x: x['score'], reverse=True)[:weight_filter]
+            pruned += len(new_patterns) - len(top_scored_patterns)
+            new_patterns = top_scored_patterns
+        else:
+            print(f'found {len(final_patterns)} breaking patterns and still searching from rest {len(new_patterns)} patterns ...', file=out)
+        patterns = new_patterns
+
+    # Filtering out patterns with remaining sequence longer than max_length, add score from their individual remaining sequence
+    final_patterns = [pattern for pattern in final_patterns if seq_len - pattern['start'] <= max_length]
+    for pattern in final_patterns:
+        if score_seq(pattern['start'], seq_len):
+            pattern['score'] += score_seq(pattern['start'], seq_len)
+            pattern['split_length'].append(seq_len - pattern['start'])   # for easy debugging
+
+    if len(final_patterns) > 0:
+        highest_score_pattern = max(final_patterns, key=lambda x: x['score'])
+        if len(highest_score_pattern['split_length']) > 1:
+            print(f"break to {highest_score_pattern['split_length']} score: {highest_score_pattern['score']:.4f}, highest among {len(final_patterns)} breaking patterns", file=out)
+        else:
+            print("left as " + str(highest_score_pattern['split_length']) + " score: " + str(highest_score_pattern['score']), file=out)
+    else:
+        highest_score_pattern = {'split_length': []}
+        print("skipped as no patterns met given criteria. manual breaking required", file=out)
+    return highest_score_pattern['split_length'][:-1], SearchStats(not truncated, generated, pruned, depth)
+
+def search_worker(task: tuple) -> tuple:
+    # Runs in a worker process. Messages are captured and returned, to be printed in order by the main process.
+    # sys.stdout is left untouched, so it is also safe to call from threads.
+    runs, params, budget_ms = task
+    log = io.StringIO()
+    split_length, stats = autobreak_search(runs, params, log, budget_ms)
+    return split_length, log.getvalue(), stats
+
+def search_in_pool(sequences: list, params: SearchParams, jobs: int, budget_ms=0):
+    # sequences are domain runs of staples, each searched within budget_ms.
+    # Searches are independent and CPU bound, so they are distributed over a process pool.
+    # Results are yielded as (split_length, log, SearchStats) in the same order as sequences, regardless of which process finished first.
+    jobs = jobs if jobs > 0 else os.cpu_count() or 1
+    chunk_size = max(1, len(sequences) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(search_worker, [(sequence, params, budget_ms) for sequence in sequences], chunksize=chunk_size)
@@ -0,0 +1,86 @@
+import mmap
+import os
+import sys
+from array import array
+
+from cadnano_tools.model import StrandModel
+from cadnano_tools.jsonio import loads, dumps, load_json
+from cadnano_tools.incremental import file_hash
+
+# Binary sidecar of a design file (<file>.sidecar), holding the parsed arrays of StrandModel, to skip JSON parsing on later runs.
+# Layout: MAGIC, header length (8 bytes little endian), JSON header padded to 8 bytes, then scaf, stap, loop and skip as raw int32.
+# The header records the hash, size and modification time of the source file, and the attributes of the model other than the arrays.
+# The arrays are memory-mapped copy-on-write: pages are shared by all processes reading the sidecar (and the page cache),
+# and only the pages changed by a process (e.g. breaks of staples) are copied to it.
+
+MAGIC = b'CNSIDE\x00\x01'     # the last byte is the version of the layout
+SIDECAR_SUFFIX = '.sidecar'
+ARRAYS = ('scaf', 'stap', 'loop', 'skip')
+
+def sidecar_path(filename: str) -> str:
+    return filename + SIDECAR_SUFFIX
+
+def write_sidecar(model: StrandModel, filename: str, source_hash: str, stat: os.stat_result):
+    # Written to a temporary file and renamed, so that other processes never map a partial sidecar.
+    header = {'source_hash': source_hash, 'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns, 'byteorder': sys.byteorder, 'itemsize': array('i').itemsize,
+              'length': model.length, 'header': model.header, 'vstrand_keys': model.vstrand_keys, 'extra': model.extra,
+              'stap_colors': [list(colours.items()) for colours in model.stap_colors], 'arrays': [len(getattr(model, name)) for name in ARRAYS]}
+    data = dumps(header)
+    data += b' ' * (-(len(MAGIC) + 8 + len(data)) % 8)
+    path = sidecar_path(filename)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(MAGIC + len(data).to_bytes(8, 'little') + data)
+            for name in ARRAYS:
+                getattr(model, name).tofile(f)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+def read_sidecar(filename: str):
+    # Memory-mapped model, or None if the sidecar is missing, broken or not of the current source file.
+    # The source is hashed only when its size or modification time differs from the record.
+    try:
+        with open(sidecar_path(filename), 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    except (OSError, ValueError):     # ValueError for empty file
+        return None
+    if mapped[:len(MAGIC)] != MAGIC:
+        return None
+    start = len(MAGIC) + 8
+    end = start + int.from_bytes(mapped[len(MAGIC):start], 'little')
+    try:
+        header = loads(mapped[start:end])
+    except ValueError:
+        return None
+    if header['byteorder'] != sys.byteorder or header['itemsize'] != array('i').itemsize:
+        return None
+    stat = os.stat(filename)
+    if (header['source_size'], header['source_mtime_ns']) != (stat.st_size, stat.st_mtime_ns) and header['source_hash'] != file_hash(filename):
+        return None
+    view = memoryview(mapped)[end:].cast('i')
+    if len(view) != sum(header['arrays']):
+        return None
+    arrays = []
+    offset = 0
+    for count in header['arrays']:
+        arrays.append(view[offset:offset + count])
+        offset += count
+    return StrandModel.from_arrays(header['header'], header['vstrand_keys'], header['extra'], header['length'], *arrays,
+                                   [{position: colour for position, colour in colours} for colours in header['stap_colors']])
+
+def load_with_sidecar(filename: str) -> StrandModel:
+    # Model from the sidecar if it is up to date, otherwise parsed from JSON and the sidecar is (re)written.
+    model = read_sidecar(filename)
+    if model is not None:
+        return model
+    stat = os.stat(filename)
+    source_hash = file_hash(filename)
+    model = StrandModel(load_json(filename))
+    try:
+        write_sidecar(model, filename, source_hash, stat)
+    except OSError as e:    # e.g. read-only folder, the run goes on without it
+        print(f"Sidecar of {filename} is not written: {e}")
+    return model
@@ -0,0 +1,79 @@
+from array import array
+from itertools import compress, repeat
+from operator import add, and_, eq, mul, ne, or_
+
+from cadnano_tools.model import StrandModel
+
+class StrandLabels:
+    # Strands of scaffold or staple, labelled by one pass over the pointer array.
+    # Bases are referred by base index h * length + p (the index in loop/skip, a quarter of the index in scaf/stap).
+    # Every base gets the strand id (-1 for empty base) and its offset along the strand (number of bases from the 5' end, or from
+    # the first labelled base of circular strand). Strands are numbered in the order of their 5' end base, followed by circular strands.
+    # Bases of strand s are order[starts[s]:starts[s + 1]] from 5' to 3', so the base is order[starts[s] + offset].
+    def __init__(self, model: StrandModel, kind='stap'):
+        strands = model.scaf if kind == 'scaf' else model.stap
+        self.length = model.length
+        base_count = model.helix_count * model.length
+        self.strand_of = array('i', [-1]) * base_count
+        self.offsets = array('i', [-1]) * base_count
+        self.order = array('i')
+        self.starts = array('i', [0])
+        self.circular = []
+        prev_helices = strands[0::4]
+        next_helices = strands[2::4]
+        # Base index of the next base (negative for 3' end) and 5' ends (no previous base) of non-empty bases,
+        # found without a Python loop over all bases.
+        next_bases = list(map(add, map(mul, next_helices, repeat(self.length)), strands[3::4]))
+        filled = list(map(or_, map(ne, prev_helices, repeat(-1)), map(ne, next_helices, repeat(-1))))
+        for base in compress(range(base_count), map(and_, map(eq, prev_helices, repeat(-1)), filled)):
+            self.label(next_bases, base, False)
+        # The rest of the non-empty bases are in circular strands.
+        if len(self.order) < sum(filled):
+            for base in compress(range(base_count), map(and_, filled, map(eq, self.strand_of, repeat(-1)))):
+                if self.strand_of[base] == -1:
+                    self.label(next_bases, base, True)
+
+    def label(self, next_bases: list, base: int, circular: bool):
+        strand_id = len(self.circular)
+        strand_of = self.strand_of
+        offsets = self.offsets
+        order = self.order
+        first = base
+        offset = 0
+        while base >= 0 and strand_of[base] == -1:
+            strand_of[base] = strand_id
+            offsets[base] = offset
+            offset += 1
+            order.append(base)
+            base = next_bases[base]
+        self.starts.append(len(order))
+        self.circular.append(circular and base == first)
+
+    @property
+    def strand_count(self) -> int:
+        return len(self.circular)
+
+    def base(self, helix_id: int, pos: int) -> int:
+        return helix_id * self.length + pos
+
+    def five_prime(self, strand_id: int) -> int:
+        # Base index of the 5' end, -1 for circular strand.
+        return -1 if self.circular[strand_id] else self.order[self.starts[strand_id]]
+
+    def three_prime(self, strand_id: int) -> int:
+        return -1 if self.circular[strand_id] else self.order[self.starts[strand_id + 1] - 1]
+
+    def strand_bases(self, helix_id: int, pos: int) -> array:
+        # Bases from the base to the 3' end of its strand (once around for circular strand). The base itself for empty base.
+        base = self.base(helix_id, pos)
+        strand_id = self.strand_of[base]
+        if strand_id == -1:
+            return array('i', [base])
+        index = self.starts[strand_id] + self.offsets[base]
+        bases = self.order[index:self.starts[strand_id + 1]]
+        if self.circular[strand_id]:
+            bases.extend(self.order[self.starts[strand_id]:index])
+        return bases
+
+    def strand_lengths(self) -> list:
+        return [end - start for start, end in zip(self.starts, self.starts[1:])]
@@ -0,0 +1,141 @@
+import math
+import random
+
+# Synthetic cadnano2 designs of any size, for benchmarks of the tools (tool-benchmark.py) and as test inputs.
+# Helices are placed on the lattice in rows of width helices, in serpentine order, so that consecutive helices are always neighbours.
+# The scaffold runs through all helices in this order. Staples run on every helix against the scaffold and cross over to the next
+# or previous helix at every crossover column (7 bp for honeycomb, 8 bp for square lattice) with probability crossover_density.
+# Staples are nicked between crossover columns with probability break_rate, and every circular staple is nicked once.
+# With ssdna_length, staple ends of neighbouring helices are joined by ssDNA loops of 2 x ssdna_length bases beyond the scaffold,
+# with probability ssdna_rate. The scaffold is kept off the first and last period of each helix for the loops.
+
+LATTICE_PERIOD = {'honeycomb': 21, 'square': 32}
+CROSSOVER_STEP = {'honeycomb': 7, 'square': 8}
+
+def default_width(helix_count: int) -> int:
+    # Even number of helices per row closest to the square root of helix count, dividing it if possible to make a full rectangle
+    # (required by horizontal-rotator.py).
+    root = math.sqrt(helix_count)
+    divisors = [width for width in range(2, helix_count + 1, 2) if helix_count % width == 0]
+    if divisors:
+        return min(divisors, key=lambda width: (abs(width - root), width))
+    return max(2, 2 * math.ceil(root / 2))
+
+def helix_places(helix_count: int, width: int) -> list:
+    # (row, col) of helices in serpentine order. Parity of row + col alternates along the order, as required for helix num.
+    places = []
+    for helix_id in range(helix_count):
+        row, step = divmod(helix_id, width)
+        places.append((row, step if row % 2 == 0 else width - 1 - step))
+    return places
+
+def generate_design(helix_count: int, length: int, lattice='honeycomb', crossover_density=1.0, break_rate=0.5, ssdna_length=0, ssdna_rate=0.5,
+                    width=None, seed=0, name='synthetic') -> dict:
+    # Returns cadnano2 JSON dict. length is rounded up to the multiple of the lattice period, at least 3 periods.
+    # Helix num is equal to helix id. The same arguments give the same design.
+    if lattice not in LATTICE_PERIOD:
+        raise ValueError(f'unknown lattice {lattice}, choose from honeycomb or square')
+    period = LATTICE_PERIOD[lattice]
+    step = CROSSOVER_STEP[lattice]
+    width = width or default_width(helix_count)
+    if helix_count < 2:
+        raise ValueError('at least 2 helices are required')
+    if lattice == 'honeycomb' and width % 2 and helix_count > width:
+        raise ValueError(f'width {width} should be even on honeycomb lattice to connect rows')
+    if not 0 <= ssdna_length < period:
+        raise ValueError(f'ssDNA loop length {ssdna_length} should be shorter than the lattice period {period}')
+    length = max(3, math.ceil(length / period)) * period
+    rnd = random.Random(seed)
+    base_count = helix_count * length
+    first, last = period, length - period   # scaffold and crossovers of staples are placed in [first, last)
+
+    def link(prev_bases, next_bases, base, next_base):
+        next_bases[base] = next_base
+        prev_bases[next_base] = base
+
+    def unlink(prev_bases, next_bases, base):
+        prev_bases[next_bases[base]] = -1
+        next_bases[base] = -1
+
+    # Scaffold runs from 5' to 3' towards larger positions on even helices.
+    scaf_prev = [-1] * base_count
+    scaf_next = [-1] * base_count
+    path = []
+    for helix_id in range(helix_count):
+        positions = range(first, last) if helix_id % 2 == 0 else range(last - 1, first - 1, -1)
+        path.extend(helix_id * length + pos for pos in positions)
+    for base, next_base in zip(path, path[1:]):
+        link(scaf_prev, scaf_next, base, next_base)
+
+    # Staples run towards smaller positions on even helices.
+    stap_prev = [-1] * base_count
+    stap_next = [-1] * base_count
+    for helix_id in range(helix_count):
+        start = helix_id * length
+        for pos in range(first + 1, last):
+            if helix_id % 2 == 0:
+                link(stap_prev, stap_next, start + pos, start + pos - 1)
+            else:
+                link(stap_prev, stap_next, start + pos - 1, start + pos)
+    # Double crossover at column x between even helix a and odd helix b: a[x] -> b[x] and b[x - 1] -> a[x - 1].
+    # Pairs of helices alternate between columns, so a helix has at most one crossover per column.
+    columns = list(range(first + step, last, step))
+    for number, column in enumerate(columns):
+        for helix_id in range(number % 2, helix_count - 1, 2):
+            if rnd.random() < crossover_density:
+                even, odd = (helix_id, helix_id + 1) if helix_id % 2 == 0 else (helix_id + 1, helix_id)
+                link(stap_prev, stap_next, even * length + column, odd * length + column)
+                link(stap_prev, stap_next, odd * length + column - 1, even * length + column - 1)
+    # ssDNA loops join the 3' end of odd helix to the 5' end of even helix beyond the right end of the scaffold,
+    # and the 3' end of even helix to the 5' end of odd helix beyond the left end.
+    if ssdna_length:
+        for helix_id in range(helix_count - 1):
+            if rnd.random() >= ssdna_rate:
+                continue
+            even, odd = (helix_id, helix_id + 1) if helix_id % 2 == 0 else (helix_id + 1, helix_id)
+            if helix_id % 2 == 0:
+                loop = [odd * length + pos for pos in range(last - 1, last + ssdna_length)] + [even * length + pos for pos in range(last + ssdna_length - 1, last - 2, -1)]
+            else:
+                loop = [even * length + pos for pos in range(first, first - ssdna_length - 1, -1)] + [odd * length + pos for pos in range(first - ssdna_length, first + 1)]
+            for base, next_base in zip(loop, loop[1:]):
+                link(stap_prev, stap_next, base, next_base)
+
+    # Nicks between pos and pos + 1, at most one between crossover columns, so that no staple base is left alone.
+    bounds = [first] + columns + [last]
+    for helix_id in range(helix_count):
+        start = helix_id * length
+        for left, right in zip(bounds, bounds[1:]):
+            if right - left >= 2 and rnd.random() < break_rate:
+                pos = rnd.randrange(left, right - 1)
+                unlink(stap_prev, stap_next, start + pos + 1 if helix_id % 2 == 0 else start + pos)
+    # Circular staples are nicked once inside a helix.
+    visited = bytearray(base_count)
+    for base in range(base_count):
+        if stap_prev[base] == -1 and stap_next[base] != -1:
+            while base != -1:
+                visited[base] = 1
+                base = stap_next[base]
+    for base in range(base_count):
+        if stap_next[base] != -1 and not visited[base]:
+            cycle = []
+            while not visited[base]:
+                visited[base] = 1
+                cycle.append(base)
+                base = stap_next[base]
+            unlink(stap_prev, stap_next, rnd.choice([base for base in cycle if abs(stap_next[base] - base) == 1]))
+
+    def pointer(base):
+        return divmod(base, length) if base != -1 else (-1, -1)
+
+    def pointers(prev_bases, next_bases, start):
+        return [[*pointer(prev_base), *pointer(next_base)] for prev_base, next_base in zip(prev_bases[start:start + length], next_bases[start:start + length])]
+
+    vstrands = []
+    for helix_id, (row, col) in enumerate(helix_places(helix_count, width)):
+        start = helix_id * length
+        five_primes = [pos for pos in range(length) if stap_prev[start + pos] == -1 and stap_next[start + pos] != -1]
+        vstrands.append({'num': helix_id, 'row': row, 'col': col,
+                         'scaf': pointers(scaf_prev, scaf_next, start), 'stap': pointers(stap_prev, stap_next, start),
+                         'loop': [0] * length, 'skip': [0] * length, 'scafLoop': [], 'stapLoop': [],
+                         'stap_colors': [[pos, rnd.randrange(16777215)] for pos in five_primes]})   # any colour but white (fixed staple)
+    return {'name': name, 'vstrands': vstrands}
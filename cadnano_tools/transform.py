@@ -0,0 +1,266 @@
+from typing import NamedTuple
+
+from cadnano_tools.jsonio import dumps, open_output
+from cadnano_tools.lattice import LatticeIndex
+
+# Geometric transforms of cadnano2 designs (slide, crop, mirror, multiply) composed into one plan, applied in a single pass over the
+# source design and written once. Each operation places one or more images of its input design in its output, and images of the
+# chain are composed into images of the source design: a helix renumbering (source num -> output num) and a position map
+# p -> sign * p + offset, valid on source positions [start, stop). Output helices are then filled one at a time from the images,
+# so the source is read once and no intermediate design is built, whatever the length of the chain.
+# The operations give the same output as simple-slider.py (slide), horizontal-rotator.py (mirror) and simple-multiplier.py -copies
+# (multiply, with all helices of the design as the basic unit).
+
+EMPTY_BASE = [-1, -1, -1, -1]
+PERIODS = (21, 32)      # honeycomb, square lattice
+
+class Helix(NamedTuple):
+    num: int
+    row: int
+    col: int
+    source: int     # num of the source helix of the other keys (scafLoop, stapLoop and the ones not used by cadnano_tools)
+
+class Image(NamedTuple):
+    helix_map: dict
+    sign: int
+    offset: int
+    start: int
+    stop: int
+
+    def then(self, image: 'Image') -> 'Image':
+        # This image followed by image of the next operation, valid where both are.
+        if self.sign == 1:
+            start, stop = image.start - self.offset, image.stop - self.offset
+        else:
+            start, stop = self.offset - image.stop + 1, self.offset - image.start + 1
+        helix_map = {num: image.helix_map[mapped] for num, mapped in self.helix_map.items() if mapped in image.helix_map}
+        return Image(helix_map, self.sign * image.sign, image.sign * self.offset + image.offset, max(self.start, start), min(self.stop, stop))
+
+    def is_identity(self) -> bool:
+        return self.sign == 1 and self.offset == 0 and all(num == mapped for num, mapped in self.helix_map.items())
+
+def occupied_bounds(vstrands: list):
+    # (first, last + 1) positions of any scaffold, staple, loop or skip over all helices, None if the design is empty.
+    def occupied(vstrand, pos):
+        return vstrand['scaf'][pos] != EMPTY_BASE or vstrand['stap'][pos] != EMPTY_BASE or vstrand['loop'][pos] != 0 or vstrand['skip'][pos] != 0
+    first = last = None
+    for vstrand in vstrands:
+        positions = range(len(vstrand['scaf']))
+        head = next((pos for pos in positions if occupied(vstrand, pos)), None)
+        if head is None:
+            continue
+        tail = next(pos for pos in reversed(positions) if occupied(vstrand, pos))
+        first = head if first is None else min(first, head)
+        last = tail if last is None else max(last, tail)
+    return None if first is None else (first, last + 1)
+
+class TransformPlan:
+    # Operations return the plan itself to be chained, e.g. TransformPlan(design).multiply(3).mirror().slide(21).write('output.json').
+    def __init__(self, design: dict):
+        self.design = design
+        self.vstrands = design['vstrands']
+        if not self.vstrands:
+            raise ValueError("No vstrands found in the file.")
+        self.length = len(self.vstrands[0]['scaf'])
+        self.helices = [Helix(vstrand['num'], vstrand['row'], vstrand['col'], vstrand['num']) for vstrand in self.vstrands]
+        self.images = [Image({vstrand['num']: vstrand['num'] for vstrand in self.vstrands}, 1, 0, 0, self.length)]
+        self.source_bounds = None     # occupied_bounds of the source, computed when first needed
+
+    def compose(self, helices: list, length: int, images: list):
+        self.images = [image.then(next_image) for next_image in images for image in self.images]
+        self.images = [image for image in self.images if image.start < image.stop and image.helix_map]
+        self.helices = helices
+        self.length = length
+        return self
+
+    def bounds(self):
+        # occupied_bounds of the design at this point of the chain.
+        if self.source_bounds is None:
+            self.source_bounds = occupied_bounds(self.vstrands) or ()
+        if not self.source_bounds:
+            return None
+        ends = []
+        for image in self.images:
+            first, last = max(image.start, self.source_bounds[0]), min(image.stop, self.source_bounds[1])
+            if first < last:
+                ends += [image.sign * first + image.offset, image.sign * (last - 1) + image.offset]
+        return (min(ends), max(ends) + 1) if ends else None
+
+    def lattice(self) -> LatticeIndex:
+        # Places of the helices at this point of the chain.
+        return LatticeIndex([helix.row for helix in self.helices], [helix.col for helix in self.helices])
+
+    def period(self):
+        # Lattice period by the length of the design as simple-slider.py, 21 (honeycomb) or 32 (square lattice), None if neither.
+        return next((period for period in PERIODS if self.length % period == 0), None)
+
+    def crop(self, start=0, stop=None):
+        # Positions [start, stop) of the design. Both ends may be outside the design to add blank positions, but occupied ones are kept.
+        start = 0 if start is None else start
+        stop = self.length if stop is None else stop
+        if start >= stop:
+            raise ValueError(f'crop range [{start}, {stop}) is empty.')
+        bounds = self.bounds()
+        if bounds and (bounds[0] < start or bounds[1] > stop):
+            raise ValueError(f'crop range [{start}, {stop}) cuts occupied positions [{bounds[0]}, {bounds[1]}).')
+        return self.compose(self.helices, stop - start, [Image({helix.num: helix.num for helix in self.helices}, 1, -start, start, stop)])
+
+    def slide(self, number=None):
+        # number positions to right (left if negative), as simple-slider.py. One lattice period if number is 0 or None.
+        if not number:
+            number = self.period()
+            if number is None:
+                raise ValueError('slide number must be given, as the length of vstrands is not a multiple of 21 or 32.')
+        if number % 21 != 0 and number % 32 != 0:
+            raise ValueError('slide number must be multiple of 21 or 32.')
+        bounds = self.bounds()
+        if number < 0 and bounds and bounds[0] < -number:
+            raise ValueError('left empty space is not enough.')
+        return self.crop(-number, self.length)
+
+    def auto_crop(self, period=None):
+        # Crop to the occupied positions of all helices, widened to multiples of period (lattice period by default) to keep crossovers
+        # in phase. An empty design is kept as is.
+        period = period or self.period()
+        if period is None:
+            raise ValueError('lattice period is unknown, as the length of vstrands is not a multiple of 21 or 32.')
+        bounds = self.bounds()
+        if bounds is None:
+            return self
+        return self.crop(bounds[0] // period * period, -(-bounds[1] // period) * period)
+
+    def mirror(self):
+        # Mirrored copy placed to the right of the design, as horizontal-rotator.py.
+        if len(self.helices) % 2:
+            raise ValueError("The file does not have an even number of vstrands.")
+        rows = [helix.row for helix in self.helices]
+        center = min(rows) + max(rows)
+        lattice = self.lattice()
+        symmetric_num_map = {}
+        for helix in self.helices:
+            if (center - helix.row, helix.col) not in lattice.helix_at:
+                raise ValueError("All vstrands do not have horizontally symmetric pairs as required.")
+            symmetric_num_map[helix.num] = self.helices[lattice.helix_at[(center - helix.row, helix.col)]].num
+        if self.length % 21 == 0:
+            if self.length % 32 == 0:
+                raise ValueError("The length of the vstrands is both a multiple of 21 and 32. The code assume the file is honeycomb lattice.")
+            phase_adjust, padding = 7, 14
+        else:
+            phase_adjust, padding = 0, 0
+        images = [Image({helix.num: helix.num for helix in self.helices}, 1, 0, 0, self.length),
+                  Image(symmetric_num_map, -1, 2 * self.length + phase_adjust - 1, 0, self.length)]
+        return self.compose(self.helices, 2 * self.length + phase_adjust + padding, images)
+
+    def multiply(self, copies: int, row_offset=0, col_offset=None):
+        # Copies of the design (including itself) shifted by row_offset and col_offset on the lattice, as simple-multiplier.py -copies.
+        unit_size = len(self.helices)
+        row_offset = 0 if row_offset is None else row_offset
+        if copies is None or copies < 1:
+            raise ValueError(f'number of copies {copies} should be at least 1.')
+        places = self.lattice().places()
+        if col_offset is None:
+            col_offset = max(col for _, col in places) - min(col for _, col in places) + 1
+            col_offset += (row_offset + col_offset - unit_size) % 2
+        if (row_offset + col_offset - unit_size) % 2:
+            raise ValueError('Row offset + column offset should be ' + ('even' if unit_size % 2 == 0 else 'odd') + ' to keep the lattice parity of helix numbers.')
+        if any((row + copy * row_offset, col + copy * col_offset) in places for copy in range(1, copies) for row, col in places):
+            raise ValueError('Copies overlap each other. Increase row or column offset.')
+        helices = [helix._replace(num=helix.num + copy * unit_size, row=helix.row + copy * row_offset, col=helix.col + copy * col_offset)
+                   for copy in range(copies) for helix in self.helices]
+        if len({helix.num for helix in helices}) != len(helices):
+            raise ValueError('Helix numbers of copies overlap. Helix numbers should be 0 to the number of helices - 1.')
+        images = [Image({helix.num: helix.num + copy * unit_size for helix in self.helices}, 1, 0, 0, self.length) for copy in range(copies)]
+        return self.compose(helices, self.length, images)
+
+    def iter_vstrands(self):
+        # Output vstrands in order, each built from the images of source helices mapped to it.
+        source = {}
+        for vstrand in self.vstrands:
+            source.setdefault(vstrand['num'], vstrand)
+        feeds = {helix.num: [] for helix in self.helices}
+        for image in self.images:
+            identity = image.is_identity()
+            for num, mapped in image.helix_map.items():
+                if mapped in feeds:
+                    feeds[mapped].append((image, identity, source[num]))
+        length = self.length
+        for helix in self.helices:
+            built = {'num': helix.num, 'row': helix.row, 'col': helix.col, 'scaf': [EMPTY_BASE] * length, 'stap': [EMPTY_BASE] * length,
+                     'loop': [0] * length, 'skip': [0] * length, 'scafLoop': [], 'stapLoop': [], 'stap_colors': []}
+            for image, identity, vstrand in feeds[helix.num]:
+                place_image(built, vstrand, image, identity)
+            yield {key: built.get(key, value) for key, value in source[helix.source].items()}
+
+    def apply(self) -> dict:
+        return {key: list(self.iter_vstrands()) if key == 'vstrands' else value for key, value in self.design.items()}
+
+    def write(self, filename: str):
+        # The output is written one helix at a time, so that memory is proportional to the longest helix, not to the whole design.
+        with open_output(filename) as f:
+            f.write(b'{')
+            for i, (key, value) in enumerate(self.design.items()):
+                f.write((b',' if i else b'') + dumps(key) + b':')
+                if key != 'vstrands':
+                    f.write(dumps(value))
+                    continue
+                f.write(b'[')
+                for n, vstrand in enumerate(self.iter_vstrands()):
+                    f.write((b',' if n else b'') + dumps(vstrand))
+                f.write(b']')
+            f.write(b'}')
+        return self
+
+def place_image(built: dict, vstrand: dict, image: Image, identity: bool):
+    # Bases of the source vstrand in the valid range of image, written to built at the mapped positions.
+    start, stop = max(image.start, 0), min(image.stop, len(vstrand['scaf']))
+    if start >= stop:
+        return
+    helix_map, sign, offset = image.helix_map, image.sign, image.offset
+    if sign == 1:
+        target = slice(start + offset, stop + offset)
+        ordered = lambda values: values[start:stop]
+    else:
+        target = slice(offset - stop + 1, offset - start + 1)
+        ordered = lambda values: values[start:stop][::-1]
+    for key in ('scaf', 'stap'):
+        if identity:
+            built[key][target] = ordered(vstrand[key])
+        else:
+            built[key][target] = [[helix_map[prev_hel] if prev_hel != -1 else -1, sign * prev_pos + offset if prev_pos != -1 else -1,
+                                   helix_map[next_hel] if next_hel != -1 else -1, sign * next_pos + offset if next_pos != -1 else -1]
+                                  for prev_hel, prev_pos, next_hel, next_pos in ordered(vstrand[key])]
+    built['loop'][target] = ordered(vstrand['loop'])
+    built['skip'][target] = ordered(vstrand['skip'])
+    built['scafLoop'].extend(vstrand['scafLoop'])
+    built['stapLoop'].extend(vstrand['stapLoop'])
+    built['stap_colors'].extend([sign * position + offset, colour] for position, colour in vstrand['stap_colors'] if start <= position < stop)
+
+def parse_operation(text: str) -> tuple:
+    # 'slide:21', 'slide' (one lattice period), 'crop:21:441', 'crop:21' (to the end), 'autocrop', 'autocrop:21' (period),
+    # 'mirror', 'multiply:3', 'multiply:3:0:4' (row and col offset).
+    name, *values = text.split(':')
+    if name not in ('slide', 'crop', 'autocrop', 'mirror', 'multiply'):
+        raise ValueError(f'unknown operation {name}, choose from slide, crop, autocrop, mirror or multiply')
+    try:
+        values = [int(value) if value else None for value in values]
+    except ValueError:
+        raise ValueError(f'arguments of operation {text} should be integers')
+    return name, values
+
+def run_operation(plan: TransformPlan, name: str, values: list) -> TransformPlan:
+    if name == 'slide':
+        return plan.slide(values[0] if values else None)
+    if name == 'crop':
+        return plan.crop(*values)
+    if name == 'autocrop':
+        return plan.auto_crop(*values)
+    if name == 'mirror':
+        return plan.mirror()
+    return plan.multiply(*values)
+
+def transform_design(design: dict, operations: list) -> TransformPlan:
+    # Plan of the operations given as text (parse_operation), in order.
+    plan = TransformPlan(design)
+    for text in operations:
+        run_operation(plan, *parse_operation(text))
+    return plan
@@ -1,7 +1,7 @@
 try:
     import argparse
-    import json
-    import random
+    from cadnano_tools.jsonio import load_json, save_json
+    from cadnano_tools.colors import hex_color_to_int, recolour_design
 except ImportError as e:
     missing_module = str(e).split(" ")[-1].replace("'", "")
     print(f"Error: The required module {missing_module} is not installed.")
@@ -17,35 +17,17 @@ def get_args():
 
 def load_json_file(filename: str) -> dict: 
     try:
-        with open(filename, 'r') as f:
-            return json.load(f)
+        return load_json(filename)
     except FileNotFoundError:
         print('Error: File not found.')
         return None
 
 def write_json_file(filename: str, data: dict):
-    with open(filename, 'w') as f:
-        json.dump(data, f)
-
-def hex_color_to_int(hex_color):
-    # Remove the leading '#' if present
-    if hex_color.startswith('#'):
-        hex_color = hex_color[1:]
-    
-    # Convert the hexadecimal string to an integer
-    return int(hex_color, 16)
+    save_json(filename, data)
 
 def color_change(blueprint: dict, output_file: str, from_color: int = None, to_color: int = None): 
-    for helix_id, helix in enumerate(blueprint['vstrands']):
-        for strand_id, strand in enumerate(helix['stap_colors']):
-            # make random number between 0 and 255.
-            rand_hex = lambda: int(16777215 * random.random())
-            if from_color == None and to_color == None:
-                new_color = rand_hex()
-                blueprint['vstrands'][helix_id]['stap_colors'][strand_id][1] = new_color
-            elif blueprint['vstrands'][helix_id]['stap_colors'][strand_id][1] == from_color:
-                new_color = to_color
-                blueprint['vstrands'][helix_id]['stap_colors'][strand_id][1] = new_color
+    # Random colours without -target and -new. See cadnano_tools/colors.py.
+    recolour_design(blueprint, from_color, to_color)
     write_json_file(output_file, blueprint)
 
 args = get_args()
@@ -1,8 +1,8 @@
 # This file is a deprecated copy of color-resetter.py, made by mistake. This file will be removed soon. 
 try:
     import argparse
-    import json
     import random
+    from cadnano_tools.jsonio import load_json, save_json
 except ImportError as e:
     missing_module = str(e).split(" ")[-1].replace("'", "")
     print(f"Error: The required module {missing_module} is not installed.")
@@ -18,15 +18,13 @@ def get_args():
 
 def load_json_file(filename: str) -> dict: 
     try:
-        with open(filename, 'r') as f:
-            return json.load(f)
+        return load_json(filename)
     except FileNotFoundError:
         print('Error: File not found.')
         return None
 
 def write_json_file(filename: str, data: dict):
-    with open(filename, 'w') as f:
-        json.dump(data, f)
+    save_json(filename, data)
 
 def hex_color_to_int(hex_color):
     # Remove the leading '#' if present
@@ -0,0 +1,62 @@
+try:
+    import argparse
+    import time
+except ImportError as e:
+    missing_module = str(e).split(" ")[-1].replace("'", "")
+    print(f"Error: The required module {missing_module} is not installed.")
+    print(f"Please install it by running 'pip install {missing_module}' and then run the script again.")
+    exit()
+
+# Runs the operations of color-resetter.py, simple-slider.py, design-transformer.py and semi-autobreak.py in order on one design,
+# loaded once and written once. See cadnano_tools/pipeline.py. The library is imported after the arguments are parsed.
+
+def get_args():
+    parser = argparse.ArgumentParser(description='Apply operations in order to a design in memory, and write only the final files.')
+    parser.add_argument('input_file', type=str, help='The input JSON file path for cadnano2 design')
+    parser.add_argument('operations', type=str, nargs='+', help='Operations in order: recolour[:target:new], slide[:number], crop:start[:stop], autocrop[:period], mirror, multiply:copies[:row_offset[:col_offset]], trace, autoconnect, autobreak')
+    parser.add_argument('-outputs', '-out', dest='outputs', type=str, default='json,domain,crossover', help='json,domain,crossover by default. Comma separated files to write: json (output.json), domain (domain_report.csv), crossover (crossover_report.csv), or none. Reports need trace, autoconnect or autobreak after the last change')
+    parser.add_argument('-max', '-long', '-l', dest='max', type=int, default=80, help='80 by default. Upper limit of staple length, as semi-autobreak.py')
+    parser.add_argument('-min', '-short', '-s', dest='min', type=int, default=18, help='18 by default. Lower limit of staple length excluding ssDNA region, as semi-autobreak.py')
+    parser.add_argument('-optimal', '-opt', '-o', dest='optimal', type=int, default=14, help='14 by default. Requirement of minimum continuous hybridization length per staple, as semi-autobreak.py')
+    parser.add_argument('-acceptable', '-accept', '-a', dest='acceptable', type=int, default=12, help='12 by default. Loosen requirement of minimum continuous hybridization length per staple, as semi-autobreak.py')
+    parser.add_argument('-distance', '-d', dest='distance', type=int, default=3, help='3 by default (4 on square lattice). Distance from 5-/3-end of staple and staple crossover, as semi-autobreak.py')
+    parser.add_argument('-penalty', '-rate', '-p', dest='penalty', type=float, default=0.3, help='0.3 by default. Penalty for acceptable seed length vs optimal, as semi-autobreak.py')
+    parser.add_argument('-limit', '-threshold', '-t', dest='limit', type=int, default=5000, help='5000 by default. Threshold of breaking pattern variation to apply filter (below) in the legacy pattern search, as semi-autobreak.py')
+    parser.add_argument('-filter', '-screen', '-f', dest='filter', type=int, default=100, help='100 by default. The patterns exceeding threshold (above) are filtered to this number in the legacy pattern search, as semi-autobreak.py')
+    parser.add_argument('-beam', '-legacy', dest='beam', action='store_true', help='Use the legacy pattern (beam) search, as semi-autobreak.py')
+    parser.add_argument('-jobs', '-j', dest='jobs', type=int, default=1, help='1 by default. Number of processes to search breaking patterns in parallel. 0 uses all CPU cores')
+    parser.add_argument('-budget-ms', '-budget', dest='budget_ms', type=int, default=0, help='0 (no limit) by default. Time limit of the breaking pattern search per staple in milliseconds, as semi-autobreak.py')
+    parser.add_argument('-cache', dest='cache', type=str, nargs='?', const='autobreak_cache.sqlite', default=None, help='Reuse breaking patterns of unchanged staples from previous runs, stored in the specified file (autobreak_cache.sqlite by default)')
+    parser.add_argument('-cache-size', dest='cache_size', type=int, default=100000, help='100000 by default. Maximum number of staples kept in the cache, as semi-autobreak.py')
+    parser.add_argument('-sidecar', dest='sidecar', action='store_true', help='Keep the parsed design in a binary file next to the input (<file>.sidecar), memory-mapped on later runs instead of parsing JSON, as semi-autobreak.py')
+    parser.add_argument('-quiet', '-q', dest='quiet', action='store_true', help='Messages of each staple are not printed')
+    parser.add_argument('-extension', '-ext', '-modification', '-mod', '-e', dest='extension', type=int, default=0, help='specified number will be added to the length of white strands during length evaluation, as semi-autobreak.py')
+    return parser.parse_args()
+
+def main():
+    args = get_args()
+    from cadnano_tools.autobreak import AutobreakConfig, load_design
+    from cadnano_tools.pipeline import Pipeline, parse_operation
+    from cadnano_tools.jsonio import load_json
+    config = AutobreakConfig(min_length=args.min, max_length=args.max, optimal_seed_len=args.optimal, acceptable_seed_len=args.acceptable, distance=args.distance,
+                             penalty_rate=args.penalty, limit_num=args.limit, filter_num=args.filter, beam=args.beam, extension=args.extension, jobs=args.jobs, cache=args.cache, cache_size=args.cache_size, budget_ms=args.budget_ms, quiet=args.quiet, sidecar=args.sidecar)
+    config.validate()
+    outputs = {name for name in args.outputs.split(',') if name and name != 'none'}
+    if not outputs <= {'json', 'domain', 'crossover'}:
+        raise ValueError(f'unknown output {", ".join(outputs - {"json", "domain", "crossover"})}, choose from json, domain, crossover or none')
+    operations = [parse_operation(text) for text in args.operations]    # all checked before loading the design
+    start = time.perf_counter()
+    pipeline = Pipeline(load_design(args.input_file, True) if args.sidecar else load_json(args.input_file), config)   # StrandModel from the sidecar, or JSON dict
+    print(f"load: {(time.perf_counter() - start) * 1000:.0f} ms")
+    for text, (name, values) in zip(args.operations, operations):
+        start = time.perf_counter()
+        pipeline.run(name, values)
+        print(f"{text}: {(time.perf_counter() - start) * 1000:.0f} ms")
+    start = time.perf_counter()
+    pipeline.write(outputs)
+    print(f"write: {(time.perf_counter() - start) * 1000:.0f} ms")
+    if pipeline.result:
+        print(pipeline.result.counts.summary(), end='')
+
+if __name__ == '__main__':
+    main()
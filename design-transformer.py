@@ -0,0 +1,28 @@
+try:
+    import argparse
+    from cadnano_tools.jsonio import load_json
+    from cadnano_tools.transform import transform_design
+except ImportError as e:
+    missing_module = str(e).split(" ")[-1].replace("'", "")
+    print(f"Error: The required module {missing_module} is not installed.")
+    print(f"Please install it by running 'pip install {missing_module}' and then run the script again.")
+    exit()
+
+# Chain of geometric operations (slide, crop, mirror, multiply) applied to a design in one pass with a single write.
+# See cadnano_tools/transform.py.
+
+def get_args():
+    parser = argparse.ArgumentParser(description='Apply slide, crop, mirror and multiply operations in order, and write the result once.')
+    parser.add_argument('input_file', type=str, help='The input JSON file path for cadnano2 design')
+    parser.add_argument('operations', type=str, nargs='+', help='Operations in order: slide[:number], crop:start[:stop], autocrop[:period], mirror, multiply:copies[:row_offset[:col_offset]]')
+    parser.add_argument('-output', '-o', dest='output', type=str, default='output.json', help='output.json by default. Output file')
+    return parser.parse_args()
+
+def main():
+    args = get_args()
+    plan = transform_design(load_json(args.input_file), args.operations)
+    plan.write(args.output)
+    print(f"{len(plan.helices)} helices x {plan.length} bp design saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
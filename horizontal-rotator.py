@@ -1,21 +1,16 @@
-import json
-import copy
 import argparse
+from cadnano_tools.jsonio import load_json, save_json
+from cadnano_tools.lattice import LatticeIndex
 
 def load_data(file_path):
-    with open(file_path, 'r') as file:
-        data = json.load(file)
-    return data
+    return load_json(file_path)
 
 def is_even_number_of_vstrands(vstrands):
     return len(vstrands) % 2 == 0
 
 def has_horizontal_symmetry(vstrands, min_row, max_row):
-    for vstrand in vstrands:
-        symmetric_row = max_row - (vstrand["row"] - min_row)
-        if not any(v["row"] == symmetric_row and v["col"] == vstrand["col"] for v in vstrands):
-            return False
-    return True
+    lattice = LatticeIndex.from_vstrands(vstrands)
+    return all((max_row - (vstrand["row"] - min_row), vstrand["col"]) in lattice.helix_at for vstrand in vstrands)
 
 def validate(vstrands):
     if not vstrands:
@@ -33,16 +28,19 @@ def validate(vstrands):
 def create_symmetric_num_map(vstrands, min_row, max_row):
     symmetric_num_map = {}
     center_row = (min_row + max_row) / 2
+    lattice = LatticeIndex.from_vstrands(vstrands)
 
     for vstrand in vstrands:
         symmetric_row = int(2 * center_row - vstrand["row"])
-        symmetric_vstrand = next((v for v in vstrands if v["row"] == symmetric_row and v["col"] == vstrand["col"]), None)
+        symmetric_id = lattice.helix_at.get((symmetric_row, vstrand["col"]))
 
-        if symmetric_vstrand:
-            symmetric_num_map[vstrand["num"]] = symmetric_vstrand["num"]
+        if symmetric_id is not None:
+            symmetric_num_map[vstrand["num"]] = vstrands[symmetric_id]["num"]
     
     return symmetric_num_map
 
+MIRRORED_KEYS = ('scaf', 'stap', 'loop', 'skip', 'scafLoop', 'stapLoop', 'stap_colors')
+
 def extend_empty_bp(vstrands, length):
     # insert empty bp to the end of vstrands
     for vstrand in vstrands:
@@ -56,7 +54,11 @@ def extend_empty_bp(vstrands, length):
 def apply_symmetric_modifications(vstrands, symmetric_num_map):
     original_length = len(vstrands[0]['stap'])
     print(f"Initial position range is [0]-[{original_length}]. Applying modifications based on symmetric relationships...")
-    original_vstrands = copy.deepcopy(vstrands)  # Deep copy to preserve the original data
+    # Lists of vstrands are only extended below, so the original data stays at the head of each list. Keep the vstrand (the first one
+    # by num) and its original list lengths, instead of a deep copy of the design.
+    original_vstrands = {}
+    for vstrand in vstrands:
+        original_vstrands.setdefault(vstrand['num'], (vstrand, {key: len(vstrand[key]) for key in MIRRORED_KEYS}))
     if original_length % 21 == 0:
         phase_adjust = 7
         vstrands = extend_empty_bp(vstrands, phase_adjust)
@@ -68,35 +70,36 @@ def apply_symmetric_modifications(vstrands, symmetric_num_map):
     for vstrand in vstrands:
         symmetric_vstrand_num = symmetric_num_map[vstrand['num']]
         # Access the symmetric vstrand's original data from original_vstrands
-        symmetric_vstrand = next((v for v in original_vstrands if v['num'] == symmetric_vstrand_num), None)
+        symmetric_vstrand, original_sizes = original_vstrands.get(symmetric_vstrand_num, (None, None))
 
         if symmetric_vstrand:
             print(f"Modifying vstrand #{vstrand['num']} with data from its symmetric counterpart #{symmetric_vstrand_num}")
+            mirrored_end = 2 * original_length + phase_adjust - 1
             
             # Handle items in scaf and stap arrays, correctly dealing with -1 values
             for key in ['scaf', 'stap']:
                 modified_data = [
-                    [symmetric_num_map[item[0]] if item[0] != -1 else -1, 
-                     2 * original_length + phase_adjust - item[1] - 1 if item[1] != -1 else -1,
-                     symmetric_num_map[item[2]] if item[2] != -1 else -1, 
-                     2 * original_length + phase_adjust - item[3] - 1 if item[3] != -1 else -1
+                    [symmetric_num_map[prev_hel] if prev_hel != -1 else -1, 
+                     mirrored_end - prev_pos if prev_pos != -1 else -1,
+                     symmetric_num_map[next_hel] if next_hel != -1 else -1, 
+                     mirrored_end - next_pos if next_pos != -1 else -1
                     ]
-                    for item in reversed(symmetric_vstrand[key])
+                    for prev_hel, prev_pos, next_hel, next_pos in reversed(symmetric_vstrand[key][:original_sizes[key]])
                 ]
                 vstrand[key].extend(modified_data)
             
             # Reverse and append data for loop and skip directly
-            vstrand['loop'].extend(reversed(symmetric_vstrand['loop']))
-            vstrand['skip'].extend(reversed(symmetric_vstrand['skip']))
+            vstrand['loop'].extend(reversed(symmetric_vstrand['loop'][:original_sizes['loop']]))
+            vstrand['skip'].extend(reversed(symmetric_vstrand['skip'][:original_sizes['skip']]))
             
             # Append scafLoop and stapLoop directly without modifications
-            vstrand['scafLoop'].extend(symmetric_vstrand['scafLoop'])
-            vstrand['stapLoop'].extend(symmetric_vstrand['stapLoop'])
+            vstrand['scafLoop'].extend(symmetric_vstrand['scafLoop'][:original_sizes['scafLoop']])
+            vstrand['stapLoop'].extend(symmetric_vstrand['stapLoop'][:original_sizes['stapLoop']])
             
             # Adjust stap_colors using the specified equation
             adjusted_stap_colors = [
-                [2 * original_length + phase_adjust - color[0] - 1, color[1]]
-                for color in symmetric_vstrand['stap_colors']
+                [mirrored_end - position, colour]
+                for position, colour in symmetric_vstrand['stap_colors'][:original_sizes['stap_colors']]
             ]
             vstrand['stap_colors'].extend(adjusted_stap_colors)
     
@@ -121,8 +124,7 @@ def main(file_path):
 
     # If modifications to vstrands are made, save the modified data
     modified_file_path = file_path.replace('.json', '_modified.json')
-    with open(modified_file_path, 'w') as file:
-        json.dump(data, file, indent=4)
+    save_json(modified_file_path, data)    # compact, as indented output of long helices is several times larger
     
     print(f"Modified file saved to {modified_file_path}")
 
@@ -1,37 +1,51 @@
 try:
-    import json
-    from collections import OrderedDict
-    import sys
+    import argparse
+    from cadnano_tools.jsonio import load_json, save_json, dumps, open_output
+    from cadnano_tools.lattice import LatticeIndex
 except ImportError as e:
     missing_module = str(e).split(" ")[-1].replace("'", "")
     print(f"Error: The required module {missing_module} is not installed.")
     print(f"Please install it by running 'pip install {missing_module}' and then run the script again.")
     exit()
 
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input_file', type=str, help='The input JSON file path for cadnano2 design, the basic unit followed by blank helices, or only the basic unit with -copies.')
+    parser.add_argument('-copies', '-n', dest='copies', type=int, default=None, help='Number of copies including the basic unit. The copied helices are created by the script, and the output is written one helix at a time, without blank helices drawn in the input file')
+    parser.add_argument('-row-offset', '-row', dest='row_offset', type=int, default=0, help='0 by default. Lattice row shift of each copy from the previous one, with -copies')
+    parser.add_argument('-col-offset', '-col', dest='col_offset', type=int, default=None, help='Lattice column shift of each copy from the previous one, with -copies. Width of the basic unit by default, plus one if needed to keep the lattice parity of helix numbers')
+    parser.add_argument('-output', '-o', dest='output', type=str, default='output.json', help='output.json by default. Output file, with -copies')
+    return parser.parse_args()
+
+def unit_helix_count(dic_text):
+    # The basic unit ends at the last helix with scaffold, searched from the last helix. None if no helix has scaffold.
+    for n in range(len(dic_text['vstrands']) - 1, -1, -1):
+        if any(base[0] != -1 for base in dic_text['vstrands'][n]['scaf']):
+            return n + 1
+    return None
+
 def validation(dic_text):
     n_max = len(dic_text['vstrands']) - 1              
     m_max = len(dic_text['vstrands'][0]['scaf']) - 1    
-    n = 0
-    while n <= n_max:
-        m = 0
-        while m <= m_max:
-            if dic_text['vstrands'][n]['scaf'][m][0] != -1:
-                unit_size = n + 1
-            m += 1
-        n += 1
+    unit_size = unit_helix_count(dic_text)
+    if unit_size is None:
+        return 'error'
     if (n_max + 1) % unit_size == 0:  
         return [n_max, m_max, unit_size]
     else:
         return 'error'
     
 def write_json_file(filename: str, data: dict):
-    with open(filename, 'w') as f:
-        json.dump(data, f)
+    save_json(filename, data)
+
+def shift_helices(ref_bases: list, bases: list, offset: int) -> list:
+    # Bases of the reference helix with helix numbers shifted by offset. Where the reference has no pointer (-1), the pointer of the helix is kept.
+    return [[ref_prev_hel + offset if ref_prev_hel != -1 else base[0], ref_prev_pos, ref_next_hel + offset if ref_next_hel != -1 else base[2], ref_next_pos]
+            for (ref_prev_hel, ref_prev_pos, ref_next_hel, ref_next_pos), base in zip(ref_bases, bases)]
 
 def periodic_copy(json_path):
     try:
-        with open(json_path) as json_text:
-            dic_text = json.load(json_text, object_pairs_hook=OrderedDict)
+        dic_text = load_json(json_path)
     except:
         raise Exception('There has been an error in input file or filepath')
     try:
@@ -39,32 +53,64 @@ def periodic_copy(json_path):
     except:
         raise Exception('JSON file is not in appropriate format. Follow README.')
     print('The basic unit with '+ str(unit_size) + ' helices has copied and is being pasted to ' + str(n_max + 1) + ' helices lattice')
-    n = unit_size
-    while n <= n_max:
-        ref_h = n - unit_size
-        dic_text['vstrands'][n]['loop'] = dic_text['vstrands'][ref_h]['loop']
-        dic_text['vstrands'][n]['skip'] = dic_text['vstrands'][ref_h]['skip']
-        dic_text['vstrands'][n]['stap_colors'] = dic_text['vstrands'][ref_h]['stap_colors']
-        m = 0
-        while m <= m_max:
-            dic_text['vstrands'][n]['scaf'][m][1] = dic_text['vstrands'][ref_h]['scaf'][m][1]
-            dic_text['vstrands'][n]['scaf'][m][3] = dic_text['vstrands'][ref_h]['scaf'][m][3]
-            if dic_text['vstrands'][ref_h]['scaf'][m][0] != -1:
-                dic_text['vstrands'][n]['scaf'][m][0] = dic_text['vstrands'][ref_h]['scaf'][m][0] + unit_size
-            if dic_text['vstrands'][ref_h]['scaf'][m][2] != -1:
-                dic_text['vstrands'][n]['scaf'][m][2] = dic_text['vstrands'][ref_h]['scaf'][m][2] + unit_size
-            dic_text['vstrands'][n]['stap'][m][1] = dic_text['vstrands'][ref_h]['stap'][m][1]
-            dic_text['vstrands'][n]['stap'][m][3] = dic_text['vstrands'][ref_h]['stap'][m][3]
-            if dic_text['vstrands'][ref_h]['stap'][m][0] != -1:
-                dic_text['vstrands'][n]['stap'][m][0] = dic_text['vstrands'][ref_h]['stap'][m][0] + unit_size
-            if dic_text['vstrands'][ref_h]['stap'][m][2] != -1:
-                dic_text['vstrands'][n]['stap'][m][2] = dic_text['vstrands'][ref_h]['stap'][m][2] + unit_size
-            m += 1
-        n += 1
+    vstrands = dic_text['vstrands']
+    # Each helix is copied from the helix unit_size before, already pasted for the later copies, as whole lists.
+    for n in range(unit_size, n_max + 1):
+        ref = vstrands[n - unit_size]
+        vstrand = vstrands[n]
+        vstrand['loop'] = ref['loop']
+        vstrand['skip'] = ref['skip']
+        vstrand['stap_colors'] = ref['stap_colors']
+        vstrand['scaf'] = shift_helices(ref['scaf'], vstrand['scaf'], unit_size)
+        vstrand['stap'] = shift_helices(ref['stap'], vstrand['stap'], unit_size)
+    write_json_file(filename='output.json', data=dic_text)
+
+def replica(vstrand: dict, copy: int, unit_size: int, row_offset: int, col_offset: int) -> dict:
+    # Helix of the basic unit placed in the copy-th copy, with helix numbers shifted by unit_size per copy. The other keys are copied as is.
+    offset = copy * unit_size
+    placed = {'num': vstrand['num'] + offset, 'row': vstrand['row'] + copy * row_offset, 'col': vstrand['col'] + copy * col_offset,
+              'scaf': shift_helices(vstrand['scaf'], vstrand['scaf'], offset), 'stap': shift_helices(vstrand['stap'], vstrand['stap'], offset)}
+    return {key: placed.get(key, value) for key, value in vstrand.items()}
 
-        write_json_file(filename='output.json', data=dic_text)
+def stream_copies(json_path, copies, row_offset=0, col_offset=None, output='output.json'):
+    # Paste the basic unit (helix #0 to the last helix with scaffold) copies times without blank helices in the input.
+    # The output is written one helix at a time, so that memory is proportional to the basic unit, not to the whole lattice.
+    try:
+        dic_text = load_json(json_path)
+    except:
+        raise Exception('There has been an error in input file or filepath')
+    unit_size = unit_helix_count(dic_text)
+    if unit_size is None or copies < 1:
+        raise Exception('JSON file is not in appropriate format. Follow README.')
+    unit = dic_text['vstrands'][:unit_size]
+    places = LatticeIndex.from_vstrands(unit).places()
+    if col_offset is None:
+        col_offset = max(col for _, col in places) - min(col for _, col in places) + 1
+        col_offset += (row_offset + col_offset - unit_size) % 2
+    # Parity of row + col of a helix follows its number on the lattice, and the number is shifted by unit_size per copy.
+    if (row_offset + col_offset - unit_size) % 2:
+        raise Exception('Row offset + column offset should be ' + ('even' if unit_size % 2 == 0 else 'odd') + ' to keep the lattice parity of helix numbers.')
+    if any((row + copy * row_offset, col + copy * col_offset) in places for copy in range(1, copies) for row, col in places):
+        raise Exception('Copies overlap each other. Increase row or column offset.')
+    print('The basic unit with '+ str(unit_size) + ' helices is being pasted to ' + str(unit_size * copies) + ' helices lattice')
+    with open_output(output) as f:
+        f.write(b'{')
+        for i, (key, value) in enumerate(dic_text.items()):
+            f.write((b',' if i else b'') + dumps(key) + b':')
+            if key != 'vstrands':
+                f.write(dumps(value))
+                continue
+            f.write(b'[')
+            for copy in range(copies):
+                for n, vstrand in enumerate(unit):
+                    f.write((b',' if copy or n else b'') + dumps(replica(vstrand, copy, unit_size, row_offset, col_offset) if copy else vstrand))
+            f.write(b']')
+        f.write(b'}')
 
 
 if __name__ == "__main__":
-    cadnano2_input_path = sys.argv[1]
-    periodic_copy(cadnano2_input_path)
+    args = get_args()
+    if args.copies is None:
+        periodic_copy(args.input_file)
+    else:
+        stream_copies(args.input_file, args.copies, args.row_offset, args.col_offset, args.output)
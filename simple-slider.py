@@ -1,71 +1,42 @@
-import json, argparse
-# simple slide specified number to right. -n to right.
+try:
+    import argparse
+    from cadnano_tools.jsonio import load_json
+    from cadnano_tools.transform import TransformPlan
+except ImportError as e:
+    missing_module = str(e).split(" ")[-1].replace("'", "")
+    print(f"Error: The required module {missing_module} is not installed.")
+    print(f"Please install it by running 'pip install {missing_module}' and then run the script again.")
+    exit()
 
-argperser = argparse.ArgumentParser(description='slide specified number to right. -n to right.')
-argperser.add_argument('file_path', type=str, help='cadnano file path')
-argperser.add_argument('number', type=int, help='number to slide')
-args = argperser.parse_args()
+# simple slide specified number to right. -n to right. With -auto-crop, blank positions of both ends are trimmed first.
+# Positions are shifted per helix by slices of cadnano_tools/transform.py, and the output is written once.
 
-# get cadnano json file as dict.
-with open(args.file_path, 'r') as f:
-    cadnano_dict = json.load(f)
-    if cadnano_dict:
-        if len(cadnano_dict['vstrands'][0]['scaf'])%21 == 0 and args.number == 0:
-            slide_num = 21
-        elif len(cadnano_dict['vstrands'][0]['scaf'])%32 == 0 and args.number == 0:
-            slide_num = 32
-        else:
-            slide_num = args.number
-            if slide_num % 21 != 0 and slide_num % 32 != 0:
-                raise Exception('slide number must be multiple of 21 or 32.')
-    else:
-        raise Exception('cadnano file is empty.')
-
-def left_empty(vstrands, num):
-    isempty = True
-    for i in range(num):
-        if vstrands['scaf'][i] != [-1,-1,-1,-1]:
-            isempty = False
-        if vstrands['stap'][i] != [-1,-1,-1,-1]:
-            isempty = False
-        if vstrands['loop'][i] != 0:
-            isempty = False
-        if vstrands['skip'][i] != 0:
-            isempty = False
-    return isempty
+def get_args():
+    argperser = argparse.ArgumentParser(description='slide specified number to right. -n to right.')
+    argperser.add_argument('file_path', type=str, help='cadnano file path')
+    argperser.add_argument('number', type=int, nargs='?', default=None, help='number to slide, multiple of 21 or 32. 0 slides one lattice period. Optional with -auto-crop')
+    argperser.add_argument('-auto-crop', '-crop', dest='auto_crop', action='store_true', help='Trim blank positions of both ends before sliding, to the multiples of the lattice period')
+    argperser.add_argument('-output', '-o', dest='output', type=str, default='output.json', help='output.json by default. Output file')
+    args = argperser.parse_intermixed_args()    # number may follow -auto-crop
+    if args.number is None and not args.auto_crop:
+        argperser.error('number to slide is required without -auto-crop.')
+    return args
 
-if slide_num >= 0:
-    for i in range(len(cadnano_dict['vstrands'])):
-        for j in range(len(cadnano_dict['vstrands'][i]['scaf'])):
-            cadnano_dict['vstrands'][i]['scaf'][j][1] = -1 if cadnano_dict['vstrands'][i]['scaf'][j][1] == -1 else cadnano_dict['vstrands'][i]['scaf'][j][1] + slide_num
-            cadnano_dict['vstrands'][i]['scaf'][j][3] = -1 if cadnano_dict['vstrands'][i]['scaf'][j][3] == -1 else cadnano_dict['vstrands'][i]['scaf'][j][3] + slide_num
-        cadnano_dict['vstrands'][i]['scaf'] = [[-1,-1,-1,-1]] * slide_num + cadnano_dict['vstrands'][i]['scaf']
-        for j in range(len(cadnano_dict['vstrands'][i]['stap'])):
-            cadnano_dict['vstrands'][i]['stap'][j][1] = -1 if cadnano_dict['vstrands'][i]['stap'][j][1] == -1 else cadnano_dict['vstrands'][i]['stap'][j][1] + slide_num
-            cadnano_dict['vstrands'][i]['stap'][j][3] = -1 if cadnano_dict['vstrands'][i]['stap'][j][3] == -1 else cadnano_dict['vstrands'][i]['stap'][j][3] + slide_num
-        cadnano_dict['vstrands'][i]['stap'] = [[-1,-1,-1,-1]] * slide_num + cadnano_dict['vstrands'][i]['stap']
-        cadnano_dict['vstrands'][i]['loop'] = [0] * slide_num + cadnano_dict['vstrands'][i]['loop']
-        cadnano_dict['vstrands'][i]['skip'] = [0] * slide_num + cadnano_dict['vstrands'][i]['skip']
-        for j in range(len(cadnano_dict['vstrands'][i]['stap_colors'])):
-            cadnano_dict['vstrands'][i]['stap_colors'][j][0] = cadnano_dict['vstrands'][i]['stap_colors'][j][0] + slide_num
-
-elif left_empty(cadnano_dict['vstrands'], -slide_num):
-    for i in range(len(cadnano_dict['vstrands'])):
-        cadnano_dict['vstrands'][i]['scaf'] = cadnano_dict['vstrands'][i]['scaf'][slide_num:]
-        for j in range(len(cadnano_dict['vstrands'][i]['scaf'])):
-            cadnano_dict['vstrands'][i]['scaf'][j][1] = -1 if cadnano_dict['vstrands'][i]['scaf'][j][1] == -1 else cadnano_dict['vstrands'][i]['scaf'][j][1] + slide_num
-            cadnano_dict['vstrands'][i]['scaf'][j][3] = -1 if cadnano_dict['vstrands'][i]['scaf'][j][3] == -1 else cadnano_dict['vstrands'][i]['scaf'][j][3] + slide_num
-        cadnano_dict['vstrands'][i]['stap'] = cadnano_dict['vstrands'][i]['stap'][slide_num:]
-        for j in range(len(cadnano_dict['vstrands'][i]['stap'])):
-            cadnano_dict['vstrands'][i]['stap'][j][1] = -1 if cadnano_dict['vstrands'][i]['stap'][j][1] == -1 else cadnano_dict['vstrands'][i]['stap'][j][1] + slide_num
-            cadnano_dict['vstrands'][i]['stap'][j][3] = -1 if cadnano_dict['vstrands'][i]['stap'][j][3] == -1 else cadnano_dict['vstrands'][i]['stap'][j][3] + slide_num
-        cadnano_dict['vstrands'][i]['loop'] = cadnano_dict['vstrands'][i]['loop'][slide_num:]
-        cadnano_dict['vstrands'][i]['skip'] = cadnano_dict['vstrands'][i]['skip'][slide_num:]
-        for j in range(len(cadnano_dict['vstrands'][i]['stap_colors'])):
-            cadnano_dict['vstrands'][i]['stap_colors'][j][0] = cadnano_dict['vstrands'][i]['stap_colors'][j][0] + slide_num
-else:
-    raise Exception('left empty space is not enough.')
+def main():
+    args = get_args()
+    # get cadnano json file as dict.
+    cadnano_dict = load_json(args.file_path)
+    if not cadnano_dict:
+        raise Exception('cadnano file is empty.')
+    plan = TransformPlan(cadnano_dict)
+    length = plan.length
+    if args.auto_crop:
+        plan.auto_crop()
+        print(f"Cropped from {length} bp to {plan.length} bp")
+    if args.number is not None:
+        plan.slide(args.number)
+    # write cadnano json file as output.json
+    plan.write(args.output)
 
-# write cadnano json file as output.json
-with open('output.json', 'w') as f:
-    json.dump(cadnano_dict, f)
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+try:
+    import argparse
+    import os
+except ImportError as e:
+    missing_module = str(e).split(" ")[-1].replace("'", "")
+    print(f"Error: The required module {missing_module} is not installed.")
+    print(f"Please install it by running 'pip install {missing_module}' and then run the script again.")
+    exit()
+
+# Command line front end of cadnano_tools.synthetic, writing a synthetic cadnano2 design of the given size.
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('helices', type=int, help='Number of helices')
+    parser.add_argument('length', type=int, help='Length of helices (bp), rounded up to the multiple of the lattice period')
+    parser.add_argument('-lattice', dest='lattice', type=str, default='honeycomb', choices=['honeycomb', 'square'], help='honeycomb (21 bp period) by default, or square (32 bp period)')
+    parser.add_argument('-width', '-w', dest='width', type=int, default=None, help='Helices per row. Even number closest to the square root of helices by default')
+    parser.add_argument('-density', dest='density', type=float, default=1.0, help='1.0 by default. Probability of staple crossover at every crossover column (7 bp on honeycomb, 8 bp on square lattice)')
+    parser.add_argument('-breaks', dest='breaks', type=float, default=0.5, help='0.5 by default. Probability of a staple nick between crossover columns')
+    parser.add_argument('-ssdna', dest='ssdna', type=int, default=0, help='0 by default. Length of ssDNA loops joining staple ends of neighbouring helices beyond the scaffold (each side of the loop)')
+    parser.add_argument('-ssdna-rate', dest='ssdna_rate', type=float, default=0.5, help='0.5 by default. Probability of ssDNA loop at each pair of helix ends, with -ssdna')
+    parser.add_argument('-seed', dest='seed', type=int, default=0, help='0 by default. Random seed. The same arguments give the same design')
+    parser.add_argument('-output', '-o', dest='output', type=str, default='synthetic.json', help='synthetic.json by default. Output file')
+    return parser.parse_args()
+
+def main():
+    args = get_args()
+    from cadnano_tools.synthetic import generate_design
+    from cadnano_tools.jsonio import save_json
+    blueprint = generate_design(args.helices, args.length, args.lattice, args.density, args.breaks, args.ssdna, args.ssdna_rate, args.width, args.seed,
+                                os.path.splitext(os.path.basename(args.output))[0])
+    save_json(args.output, blueprint)
+    print(f"{args.helices} helices x {len(blueprint['vstrands'][0]['scaf'])} bp {args.lattice} design saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
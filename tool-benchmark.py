@@ -0,0 +1,212 @@
+try:
+    import argparse
+    import contextlib
+    import csv
+    import importlib.util
+    import math
+    import os
+    import runpy
+    import sys
+    import tempfile
+    import time
+    import tracemalloc
+except ImportError as e:
+    missing_module = str(e).split(" ")[-1].replace("'", "")
+    print(f"Error: The required module {missing_module} is not installed.")
+    print(f"Please install it by running 'pip install {missing_module}' and then run the script again.")
+    exit()
+
+# Benchmark of the tools on synthetic designs (cadnano_tools.synthetic) of increasing size.
+# Each tool is run on a fresh input prepared beforehand, and the best time of repeated runs and the peak memory of a separate run
+# (tracemalloc slows the run down) are reported. Scripts working on files (multiplier, rotator, slider) are timed from reading
+# the input file to writing the output file, in a temporary folder. Messages of the tools are discarded.
+
+TOOLS = ['autoconnect', 'trace', 'search', 'crossover', 'multiplier', 'rotator', 'slider']
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_HEADER = ['tool', 'lattice', 'helices', 'length', 'bases', 'time_ms', 'peak_kb', 'error']
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-sizes', dest='sizes', type=str, nargs='+', default=['12x210', '24x420', '48x840'], help='12x210 24x420 48x840 by default. Design sizes as helices x length (bp). Length is rounded up to the multiple of the lattice period')
+    parser.add_argument('-lattice', dest='lattice', type=str, default='honeycomb', choices=['honeycomb', 'square'], help='honeycomb (21 bp period) by default, or square (32 bp period)')
+    parser.add_argument('-density', dest='density', type=float, default=1.0, help='1.0 by default. Probability of staple crossover at every crossover column (7 bp on honeycomb, 8 bp on square lattice)')
+    parser.add_argument('-breaks', dest='breaks', type=float, default=0.5, help='0.5 by default. Probability of a staple nick between crossover columns')
+    parser.add_argument('-ssdna', dest='ssdna', type=int, default=0, help='0 by default. Length of ssDNA loops joining staple ends of neighbouring helices beyond the scaffold (each side of the loop)')
+    parser.add_argument('-ssdna-rate', dest='ssdna_rate', type=float, default=0.5, help='0.5 by default. Probability of ssDNA loop at each pair of helix ends, with -ssdna')
+    parser.add_argument('-seed', dest='seed', type=int, default=0, help='0 by default. Random seed of the designs')
+    parser.add_argument('-tools', dest='tools', type=str, default=','.join(TOOLS), help=f'{",".join(TOOLS)} by default. Comma separated tools to benchmark')
+    parser.add_argument('-repeat', '-r', dest='repeat', type=int, default=3, help='3 by default. Number of timed runs of each tool and size. The best time is reported')
+    parser.add_argument('-no-memory', dest='no_memory', action='store_true', help='Skip the peak memory measurement')
+    parser.add_argument('-output', '-o', dest='output', type=str, default='benchmark.csv', help='benchmark.csv by default. CSV file of the results')
+    parser.add_argument('-compare', dest='compare', type=str, default=None, help='Previous CSV file of the benchmark. Runs slower than -threshold times the previous time are reported as regressions, with exit status 1')
+    parser.add_argument('-threshold', dest='threshold', type=float, default=1.2, help='1.2 by default. Ratio to the previous time regarded as regression, with -compare')
+    parser.add_argument('-keep', dest='keep', type=str, default=None, help='Folder to keep the generated designs (synthetic_<helices>x<length>.json)')
+    return parser.parse_args()
+
+def parse_size(size: str) -> tuple[int, int]:
+    helices, length = size.lower().split('x')
+    return int(helices), int(length)
+
+def load_script(name: str):
+    # Module of a script with main guard, imported from its file as the name has hyphens.
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), os.path.join(SCRIPT_DIR, name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@contextlib.contextmanager
+def working_directory(path: str):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+def multiplier_input(blueprint: dict) -> dict:
+    # Basic unit of the first half helices, followed by blank helices to be pasted, as simple-multiplier.py expects.
+    unit = len(blueprint['vstrands']) // 2
+    vstrands = []
+    for vstrand in blueprint['vstrands'][unit:]:
+        length = len(vstrand['scaf'])
+        vstrands.append({**vstrand, 'scaf': [[-1, -1, -1, -1] for _ in range(length)], 'stap': [[-1, -1, -1, -1] for _ in range(length)], 'stap_colors': []})
+    return {**blueprint, 'vstrands': blueprint['vstrands'][:unit] + vstrands}
+
+def prepare(tool: str, blueprint: dict, files: dict):
+    # Input of the tool, and the function running the tool on it. Preparation is excluded from the measurement.
+    from cadnano_tools.autobreak import AutobreakConfig
+    from cadnano_tools.model import StrandModel
+    from cadnano_tools.analysis import autoconnect, trace_all, short_domain_counter, crossover_summary
+    from cadnano_tools.search import search_worker
+    if tool == 'multiplier':
+        module = load_script('simple-multiplier')
+        return lambda: module.periodic_copy(files['multiplier'])
+    if tool == 'rotator':
+        module = load_script('horizontal-rotator')
+        return lambda: module.main(files['design'])
+    if tool == 'slider':
+        def slide():
+            sys.argv = [os.path.join(SCRIPT_DIR, 'simple-slider.py'), files['design'], '0']
+            runpy.run_path(sys.argv[0], run_name='__main__')
+        return slide
+    model = StrandModel(blueprint)
+    if tool == 'autoconnect':
+        return lambda: autoconnect(model, quiet=True)
+    autoconnect(model, quiet=True)
+    params = AutobreakConfig().search_params(model)
+    if tool == 'trace':
+        return lambda: trace_all(model, params)
+    staples, short_domain_list = trace_all(model, params)
+    if tool == 'search':
+        sequences = list(dict.fromkeys(staple.runs for staple in staples))
+        return lambda: [search_worker((sequence, params, 0)) for sequence in sequences]
+    if tool == 'crossover':
+        return lambda: crossover_summary(model, short_domain_counter([0] * model.helix_count, short_domain_list))
+    raise ValueError(f'unknown tool {tool}, choose from {", ".join(TOOLS)}')
+
+def measure(tool: str, blueprint: dict, files: dict, folder: str, repeat: int, memory: bool) -> tuple[float, int]:
+    # Best time (ms) of repeated runs and peak memory (kB, None if skipped) of the tool.
+    best = math.inf
+    peak = None
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), working_directory(folder):
+        argv = sys.argv
+        try:
+            for _ in range(repeat):
+                run = prepare(tool, blueprint, files)
+                start = time.perf_counter()
+                run()
+                best = min(best, (time.perf_counter() - start) * 1000)
+            if memory:
+                run = prepare(tool, blueprint, files)
+                tracemalloc.start()
+                try:
+                    run()
+                    peak = tracemalloc.get_traced_memory()[1] // 1024
+                finally:
+                    tracemalloc.stop()
+        finally:
+            sys.argv = argv
+    return best, peak
+
+def scaling(rows: list) -> str:
+    # Exponent k of time ~ bases^k, fitted by least squares on log-log scale.
+    points = [(math.log(row['bases']), math.log(row['time_ms'])) for row in rows if not row['error'] and row['time_ms'] > 0]
+    if len(points) < 2:
+        return '-'
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return '-'
+    return f"n^{sum((x - mean_x) * (y - mean_y) for x, y in points) / variance:.2f}"
+
+def print_curves(results: list, sizes: list):
+    # Time and peak memory of each tool over the sizes, with the scaling exponent of time.
+    print(f"{'tool':<12}" + ''.join(f'{size:>14}' for size in sizes) + f"{'scaling':>10}")
+    for tool in dict.fromkeys(row['tool'] for row in results):
+        rows = [row for row in results if row['tool'] == tool]
+        cells = ['error' if row['error'] else f"{row['time_ms']:.1f} ms" for row in rows]
+        print(f'{tool:<12}' + ''.join(f'{cell:>14}' for cell in cells) + f'{scaling(rows):>10}')
+        if any(row['peak_kb'] is not None for row in rows):
+            cells = ['' if row['peak_kb'] is None else f"{row['peak_kb']} kB" for row in rows]
+            print(f"{'  peak':<12}" + ''.join(f'{cell:>14}' for cell in cells))
+
+def compare(results: list, filename: str, threshold: float) -> int:
+    # Prints the ratio of time to the previous run of the same tool, lattice and size. Returns the number of regressions.
+    with open(filename, newline='') as f:
+        previous = {(row['tool'], row['lattice'], row['helices'], row['length']): row for row in csv.DictReader(f)}
+    regressions = 0
+    for row in results:
+        old = previous.get((row['tool'], row['lattice'], str(row['helices']), str(row['length'])))
+        if old is None or row['error'] or old['error'] or not float(old['time_ms']):
+            continue
+        ratio = row['time_ms'] / float(old['time_ms'])
+        regression = ratio > threshold
+        regressions += regression
+        print(f"{row['tool']} {row['helices']}x{row['length']}: {float(old['time_ms']):.1f} ms -> {row['time_ms']:.1f} ms ({ratio:.2f}x){' REGRESSION' if regression else ''}")
+    return regressions
+
+def main():
+    args = get_args()
+    from cadnano_tools.synthetic import generate_design
+    from cadnano_tools.jsonio import save_json
+    tools = [tool for tool in args.tools.split(',') if tool]
+    if not set(tools) <= set(TOOLS):
+        raise ValueError(f'unknown tool {", ".join(set(tools) - set(TOOLS))}, choose from {", ".join(TOOLS)}')
+    results = []
+    labels = []
+    with tempfile.TemporaryDirectory() as folder:
+        for size in args.sizes:
+            helices, length = parse_size(size)
+            blueprint = generate_design(helices, length, args.lattice, args.density, args.breaks, args.ssdna, args.ssdna_rate, seed=args.seed)
+            length = len(blueprint['vstrands'][0]['scaf'])
+            labels.append(f'{helices}x{length}')
+            files = {'design': os.path.join(folder, 'design.json'), 'multiplier': os.path.join(folder, 'unit.json')}
+            save_json(files['design'], blueprint)
+            save_json(files['multiplier'], multiplier_input(blueprint))
+            if args.keep:
+                os.makedirs(args.keep, exist_ok=True)
+                save_json(os.path.join(args.keep, f'synthetic_{helices}x{length}.json'), blueprint)
+            for tool in tools:
+                row = {'tool': tool, 'lattice': args.lattice, 'helices': helices, 'length': length, 'bases': helices * length, 'time_ms': 0.0, 'peak_kb': None, 'error': ''}
+                try:
+                    row['time_ms'], row['peak_kb'] = measure(tool, blueprint, files, folder, max(1, args.repeat), not args.no_memory)
+                except Exception as e:     # e.g. a design not accepted by the tool, reported in the table
+                    row['error'] = f'{type(e).__name__}: {e}'
+                print(f"{tool} {helices}x{length}: {row['error'] or format(row['time_ms'], '.1f') + ' ms'}")
+                results.append(row)
+    print()
+    print_curves(results, labels)
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, CSV_HEADER)
+        writer.writeheader()
+        writer.writerows({**row, 'time_ms': round(row['time_ms'], 3), 'peak_kb': '' if row['peak_kb'] is None else row['peak_kb']} for row in results)
+    print(f"Results: {args.output}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"{regressions} regressions over {args.threshold}x of {args.compare}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()